@@ -1,11 +1,16 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
 from fastapi.responses import FileResponse, StreamingResponse
 from app.models import VideoRequest
-from app.services.video_generator import generate_video
-from app.core.logging import setup_logging
+from app.services.video_generator import generate_video, generate_videos
+from app.core.logging import setup_logging, log_context
+from app.core.config import settings
+from app.utils.cancellation import CancellationToken, JobCancelled, ABANDONED, CLIENT_DISCONNECTED, DELETED, DEADLINE
+from app.utils.resources import resource_counts
 import os
 import asyncio
 import json
+import uuid
+import zipfile
 from typing import Dict
 
 router = APIRouter()
@@ -14,6 +19,30 @@ logger = setup_logging()
 # In-memory store for progress queues: request_id -> asyncio.Queue
 progress_store: Dict[str, asyncio.Queue] = {}
 
+# Running renders: job id (request_id when given, returned as X-Job-Id) -> CancellationToken
+jobs: Dict[str, CancellationToken] = {}
+
+# HTTP status returned when a render is cancelled, by reason
+CANCEL_STATUS = {CLIENT_DISCONNECTED: 499, DELETED: 409, DEADLINE: 504}
+
+def zip_outputs(paths: list[str]) -> str:
+    """Bundles the artifacts of a multi-output job into one archive (stored: mp4 is already compressed)."""
+    zip_path = os.path.splitext(paths[0])[0] + "_outputs.zip"
+    try:
+        with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED) as archive:
+            for path in paths:
+                archive.write(path, arcname=os.path.basename(path))
+    except BaseException:
+        # e.g. disk full: a partial archive is of no use to anyone
+        if os.path.exists(zip_path):
+            remove_file(zip_path)
+        raise
+    finally:
+        # The targets are never served on their own, whether the archive was written or not
+        for path in paths:
+            remove_file(path)
+    return zip_path
+
 def remove_file(path: str):
     try:
         os.remove(path)
@@ -66,10 +95,57 @@ async def progress_stream(request: Request, request_id: str):
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
+async def watch_disconnect(http_request: Request, token: CancellationToken):
+    """Cancels the job when the caller goes away (or its deadline passes) while it renders."""
+    while not token.cancelled:
+        if await http_request.is_disconnected():
+            token.cancel(CLIENT_DISCONNECTED)
+            return
+        await asyncio.sleep(settings.DISCONNECT_POLL_INTERVAL)
+
+@router.get("/resources")
+async def resources():
+    """Live ffmpeg process budget usage and open readers/writers, node-wide and per job."""
+    return resource_counts()
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancels a running render; it stops at its next checkpoint and releases its files."""
+    token = jobs.get(job_id)
+    if token is None:
+        raise HTTPException(status_code=404, detail="Job not found or already finished")
+    token.cancel(DELETED)
+    logger.info(f"Cancellation requested for job {job_id}")
+    return {"job_id": job_id, "status": "cancelling"}
+
 @router.post("/generate-video")
-async def generate_video_endpoint(request: VideoRequest, background_tasks: BackgroundTasks):
+async def generate_video_endpoint(request: VideoRequest, http_request: Request, background_tasks: BackgroundTasks):
+    job_id = request.request_id or uuid.uuid4().hex
+    token = CancellationToken(timeout=settings.JOB_TIMEOUT_SECONDS)
+    jobs[job_id] = token
+    watcher = asyncio.create_task(watch_disconnect(http_request, token))
     try:
-        logger.info(f"Received request: {request}")
+        with log_context(job_id=job_id, phase="request"):
+            response = await _generate_video_response(request, background_tasks, token, job_id)
+    except HTTPException as e:
+        e.headers = {**(e.headers or {}), "X-Job-Id": job_id}
+        raise
+    except asyncio.CancelledError:
+        # Server shutdown or a middleware gave up on the request: the executor
+        # thread does not stop with us, so stop the render at its next checkpoint
+        token.cancel(ABANDONED)
+        raise
+    finally:
+        watcher.cancel()
+        if jobs.get(job_id) is token:
+            del jobs[job_id]
+    response.headers["X-Job-Id"] = job_id
+    return response
+
+async def _generate_video_response(request: VideoRequest, background_tasks: BackgroundTasks, token: CancellationToken, job_id: str):
+    try:
+        logger.info(f"Received request: surah={request.surah} ayahs={request.ayah_start}-{request.ayah_end} "
+                    f"platform={request.platform.value} resolution={request.resolution}")
         
         # Run Sync CPU-bound task in thread pool to avoid blocking Event Loop (crucial for SSE)
         loop = asyncio.get_running_loop() # Capture valid loop in main thread
@@ -91,7 +167,18 @@ async def generate_video_endpoint(request: VideoRequest, background_tasks: Backg
         if request.request_id:
             progress_store[request.request_id] = asyncio.Queue()
 
-        video_path = await loop.run_in_executor(None, generate_video, request, progress_callback)
+        if request.outputs:
+            # Multi-output: one decode pass, all artifacts returned as a single zip
+            video_paths = await loop.run_in_executor(None, generate_videos, request, progress_callback, token, job_id)
+            zip_path = await loop.run_in_executor(None, zip_outputs, video_paths)
+
+            if request.request_id and request.request_id in progress_store:
+                 progress_store[request.request_id].put_nowait("DONE")
+
+            background_tasks.add_task(remove_file, zip_path)
+            return FileResponse(zip_path, media_type="application/zip", filename=os.path.basename(zip_path))
+
+        video_path = await loop.run_in_executor(None, generate_video, request, progress_callback, token, job_id)
         
         # Signal completion
         if request.request_id and request.request_id in progress_store:
@@ -103,6 +190,11 @@ async def generate_video_endpoint(request: VideoRequest, background_tasks: Backg
         background_tasks.add_task(remove_file, video_path)
         return FileResponse(video_path, media_type="video/mp4", filename=os.path.basename(video_path))
         
+    except JobCancelled as e:
+        if request.request_id and request.request_id in progress_store:
+            progress_store[request.request_id].put_nowait({"error": str(e), "status": "cancelled"})
+        logger.info(f"Render stopped: {e}")
+        raise HTTPException(status_code=CANCEL_STATUS.get(e.reason, 499), detail=str(e))
     except ValueError as e:
         if request.request_id and request.request_id in progress_store:
             progress_store[request.request_id].put_nowait({"error": str(e)})
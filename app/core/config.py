@@ -1,4 +1,5 @@
 import os
+from pydantic import Field
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -19,7 +20,15 @@ class Settings(BaseSettings):
     AUDIO_CODEC: str = "aac"
     VIDEO_BITRATE: str = "8000k"
     AUDIO_BITRATE: str = "192k"
+    FRAME_RING_SIZE: int = 3                # preallocated frames each background reader decodes ahead into
     
+    # Job Settings
+    JOB_TIMEOUT_SECONDS: int = 900          # renders still running after this are cancelled, 0 disables
+    DISCONNECT_POLL_INTERVAL: float = 1.0   # seconds between client-disconnect checks during a render
+    # Node-wide cap on concurrent ffmpeg processes. Rendering N outputs runs one shared decoder plus one
+    # encoder per output (N + 1), so anything below 2 could not render even a single video
+    MAX_FFMPEG_PROCESSES: int = Field(default=8, ge=2)
+
     # Text Settings
     ARABIC_FONT_COLOR: str = "#FFFFFF"
     ENGLISH_FONT_COLOR: str = "#CCCCCC"
@@ -32,6 +41,17 @@ class Settings(BaseSettings):
     OUTPUT_DIR: str = os.path.join(BASE_DIR, "outputs")
     LOGS_DIR: str = os.path.join(BASE_DIR, "logs")
     
+    # Logging (queue-based: callers enqueue, one background thread writes)
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"             # "json" or "text"
+    LOG_FILE: str = "quran_reel.log"
+    LOG_MAX_BYTES: int = 20 * 1024 * 1024
+    LOG_BACKUP_COUNT: int = 5
+    LOG_ROTATE_INTERVAL: int = 24 * 3600 # seconds, 0 disables time-based rotation
+    LOG_QUEUE_SIZE: int = 10000          # records beyond this are dropped, never blocking
+    LOG_RATE_LIMIT_BURST: int = 20       # identical messages allowed per interval, 0 disables
+    LOG_RATE_LIMIT_INTERVAL: float = 10.0
+
     ARABIC_FONT: str = os.path.join(FONTS_DIR, "Amiri-Regular.ttf")
     ENGLISH_FONT: str = os.path.join(FONTS_DIR, "arial.ttf")
     
@@ -1,20 +1,255 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
 from app.core.config import settings
 
+# Per-job context stamped onto every record. Set inside the render thread (or the
+# request's task), so concurrent jobs never see each other's values.
+_job_id: ContextVar[str | None] = ContextVar("log_job_id", default=None)
+_phase: ContextVar[str | None] = ContextVar("log_phase", default=None)
+
+_setup_lock = threading.Lock()
+_listener: logging.handlers.QueueListener | None = None
+
+
+@contextmanager
+def log_context(job_id=None, phase=None):
+    """Attaches `job_id` / `phase` to all records logged by this thread or task inside the block."""
+    job_token = _job_id.set(job_id)
+    phase_token = _phase.set(phase)
+    try:
+        yield
+    finally:
+        _phase.reset(phase_token)
+        _job_id.reset(job_token)
+
+
+def set_log_phase(phase):
+    """Updates the phase of the current job context (e.g. 'fetching', 'rendering')."""
+    _phase.set(phase)
+
+
+class JobContextFilter(logging.Filter):
+    """Copies the caller's job id and phase onto the record before it leaves the thread."""
+
+    def filter(self, record):
+        record.job_id = _job_id.get()
+        record.phase = _phase.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most `burst` identical messages (same logger, level and
+    template) per `interval` seconds. The first message of the next window
+    reports how many were dropped; if the message does not come back, a
+    summary is reported once its window has expired, on the next record of
+    any kind (a process that goes silent for good loses that last count).
+    """
+
+    def __init__(self, burst=20, interval=10.0, clock=time.monotonic, report=None):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.clock = clock
+        self.report = report or _report_suppressed
+        self._lock = threading.Lock()
+        self._windows = {}  # key -> [window start, count, suppressed]
+        self._suppressing = set()  # keys whose current window dropped something
+
+    def filter(self, record):
+        if self.burst <= 0:
+            return True
+
+        key = (record.name, record.levelno, str(record.msg))
+        now = self.clock()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                self._suppressing.discard(key)
+                if len(self._windows) > 1024:
+                    self._prune(now)
+            elif window[1] < self.burst:
+                window[1] += 1
+                suppressed = 0
+            else:
+                window[2] += 1
+                self._suppressing.add(key)
+                return False
+            expired = self._take_expired(now)
+
+        for expired_key, count in expired:
+            self.report(expired_key, count)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+    def _take_expired(self, now):
+        """Removes the windows that dropped messages and have since expired; returns (key, dropped) pairs."""
+        expired = [k for k in self._suppressing if now - self._windows[k][0] >= self.interval]
+        for k in expired:
+            self._suppressing.discard(k)
+        return [(k, self._windows.pop(k)[2]) for k in expired]
+
+    def _prune(self, now):
+        expired = [k for k, w in self._windows.items() if now - w[0] >= self.interval and not w[2]]
+        for k in expired:
+            del self._windows[k]
+
+
+def _report_suppressed(key, suppressed):
+    """Logs the summary of an expired rate limit window, outside of any job's context."""
+    name, level, template = key
+    with log_context():
+        logging.getLogger(name).log(level, "Repeats of %r were rate limited", template,
+                                    extra={"suppressed": suppressed})
+
+
+class JobQueueHandler(logging.handlers.QueueHandler):
+    """
+    Non-blocking handler used by every caller: records are formatted into plain
+    data here and handed to the background writer. When the queue is full the
+    record is dropped and counted instead of blocking the caller.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        record.stack_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, carrying the job id and phase when present."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "where": f"{record.module}:{record.lineno}",
+            "message": record.getMessage(),
+        }
+        for field in ("job_id", "phase", "suppressed"):
+            value = getattr(record, field, None)
+            if value:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """The original human-readable format, with the job context prepended."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s - %(levelname)s - [%(name)s:%(lineno)d] - %(context)s%(message)s')
+
+    def format(self, record):
+        context = [v for v in (getattr(record, "job_id", None), getattr(record, "phase", None)) if v]
+        record.context = f"[{' '.join(context)}] " if context else ""
+        message = super().format(record)
+        if getattr(record, "suppressed", 0):
+            message += f" ({record.suppressed} repeats suppressed)"
+        return message
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler that also rolls over every `interval` seconds."""
+
+    def __init__(self, filename, maxBytes=0, backupCount=5, interval=0, encoding=None):
+        super().__init__(filename, maxBytes=maxBytes, backupCount=max(1, backupCount),
+                         encoding=encoding, delay=True)
+        self.interval = interval
+        self.rollover_at = time.time() + interval if interval else None
+
+    def shouldRollover(self, record):
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        if self.interval:
+            self.rollover_at = time.time() + self.interval
+
+
+def _make_formatter():
+    return JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter()
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        try:
+            _listener.stop()
+        except queue.Full:
+            pass
+        _listener = None
+
+
 def setup_logging():
-    os.makedirs(settings.LOGS_DIR, exist_ok=True)
-    log_filename = os.path.join(settings.LOGS_DIR, f"quran_reel_{datetime.now().strftime('%Y%m%d')}.log")
-
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - [%(name)s:%(lineno)d] - %(message)s',
-        handlers=[
-            logging.FileHandler(log_filename, encoding='utf-8'),
-            logging.StreamHandler()
-        ]
-    )
-    
+    """
+    Installs the queue-based pipeline once per process: callers only enqueue
+    records, a single background thread writes them to the rotating log file
+    and the console. Safe to call from every module.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is None:
+            os.makedirs(settings.LOGS_DIR, exist_ok=True)
+            formatter = _make_formatter()
+
+            file_handler = SizeAndTimeRotatingFileHandler(
+                os.path.join(settings.LOGS_DIR, settings.LOG_FILE),
+                maxBytes=settings.LOG_MAX_BYTES,
+                backupCount=settings.LOG_BACKUP_COUNT,
+                interval=settings.LOG_ROTATE_INTERVAL,
+                encoding='utf-8',
+            )
+            file_handler.setFormatter(formatter)
+            stream_handler = logging.StreamHandler()
+            stream_handler.setFormatter(formatter)
+
+            log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+            queue_handler = JobQueueHandler(log_queue)
+            queue_handler.addFilter(JobContextFilter())
+            queue_handler.addFilter(RateLimitFilter(settings.LOG_RATE_LIMIT_BURST,
+                                                    settings.LOG_RATE_LIMIT_INTERVAL))
+
+            root = logging.getLogger()
+            root.setLevel(settings.LOG_LEVEL)
+            root.addHandler(queue_handler)
+
+            _listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler)
+            _listener.start()
+            atexit.register(_stop_listener)
+
     # helper to get logger
     return logging.getLogger("quran_reels")
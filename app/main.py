@@ -12,6 +12,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Browser clients need the job id of a render to find it in the logs
+    expose_headers=["X-Job-Id"],
 )
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
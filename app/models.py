@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Literal
 from enum import Enum
 
@@ -6,6 +6,10 @@ class VideoPlatform(str, Enum):
     REEL = "reel"       # 9:16 (TikTok, Shorts, Reels)
     YOUTUBE = "youtube" # 16:9 (Standard Video)
 
+class OutputTarget(BaseModel):
+    platform: VideoPlatform = VideoPlatform.REEL
+    resolution: Literal[360, 480, 720, 1080] = 720
+
 class VideoRequest(BaseModel):
     surah: int
     ayah_start: int
@@ -16,3 +20,5 @@ class VideoRequest(BaseModel):
     platform: VideoPlatform = VideoPlatform.REEL
     resolution: Literal[360, 480, 720, 1080] = 720
     request_id: str | None = None
+    # Multi-output mode: render every target from one decode pass (platform/resolution above are ignored)
+    outputs: list[OutputTarget] | None = Field(default=None, min_length=1, max_length=4)
@@ -0,0 +1,248 @@
+import os
+import queue
+import subprocess as sp
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+from moviepy.config import FFMPEG_BINARY
+from moviepy.tools import cross_platform_popen_params
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from app.core.config import settings
+
+
+def probe_video_size(filename):
+    """(width, height) of a video as ffmpeg decodes it, i.e. with rotation metadata applied."""
+    infos = ffmpeg_parse_infos(filename)
+    width, height = infos["video_size"]
+    if abs(infos.get("video_rotation", 0)) in (90, 270):
+        width, height = height, width
+    return width, height
+
+
+def background_filter(source_size, target_size):
+    """
+    ffmpeg filter chain that produces the same picture as the MoviePy pipeline
+    (rotated(angle=-90) for a portrait target from a landscape source, upscale
+    to cover, center crop) directly at `target_size`. Only the region that ends
+    up visible is cropped, turned and scaled.
+    """
+    width, height = source_size
+    target_width, target_height = target_size
+
+    # rotated() keeps the landscape canvas, so the cover scale is computed on it
+    rotate = target_height > target_width and not height > width
+    scale_factor = max(target_width / width, target_height / height, 1)
+
+    crop_width = round(target_width / scale_factor)
+    crop_height = round(target_height / scale_factor)
+    if rotate:
+        crop_width, crop_height = crop_height, crop_width
+
+    chain = [f"crop={crop_width}:{crop_height}"]
+    if rotate:
+        chain.append("transpose=clock")
+    if scale_factor > 1:
+        chain.append(f"scale={target_width}:{target_height}:flags=lanczos")
+    return ",".join(chain)
+
+
+class _FrameRing:
+    """
+    Small ring of preallocated frames filled from one raw RGB pipe by a
+    read-ahead thread, so decoding overlaps compositing and encoding.
+    """
+
+    def __init__(self, pipe, frame_shape, ring_size):
+        self.pipe = pipe
+        self.frames = [np.empty(frame_shape, dtype=np.uint8) for _ in range(ring_size)]
+        self._free = queue.Queue()
+        self._ready = queue.Queue()
+        for index in range(ring_size):
+            self._free.put(index)
+        self._current = None
+        self._thread = threading.Thread(target=self._read_ahead, daemon=True)
+        self._thread.start()
+
+    def _read_ahead(self):
+        try:
+            while True:
+                index = self._free.get()
+                if index is None:
+                    return
+                view = memoryview(self.frames[index]).cast("B")
+                filled = 0
+                while filled < len(view):
+                    count = self.pipe.readinto(view[filled:])
+                    if not count:
+                        return
+                    filled += count
+                self._ready.put(index)
+        except (OSError, ValueError):
+            # pipe closed under us by close()
+            return
+        finally:
+            self._ready.put(None)
+
+    def read(self):
+        """Next frame, or None at end of stream. Valid (and writable) until the following read()."""
+        if self._current is not None:
+            self._free.put(self._current)
+            self._current = None
+        index = self._ready.get()
+        if index is None:
+            # Keep the end-of-stream marker for any later read()
+            self._ready.put(None)
+            return None
+        self._current = index
+        return self.frames[index]
+
+    def close(self):
+        self._free.put(None)
+        self._thread.join()
+        self.pipe.close()
+
+
+class ScaledVideoReader:
+    """
+    Decodes a background video once with ffmpeg, looping it as needed, and
+    `split`s the decoded frames into one crop/transpose/scale chain per target
+    size. Each target's frames arrive on their own pipe (stdout for the first,
+    extra inherited descriptors for the others) straight into that target's
+    ring of preallocated buffers, so no frame is allocated once it is running.
+    """
+
+    def __init__(self, filename, source_size, target_sizes, fps, n_frames, ring_size=None):
+        ring_size = max(2, ring_size or settings.FRAME_RING_SIZE)
+        if len(target_sizes) > 1 and os.name == "nt":
+            raise OSError("Rendering several outputs from one decoder needs a POSIX host (inherited pipes)")
+
+        count = len(target_sizes)
+        labels = [f"[v{index}]" for index in range(count)]
+        graph = [f"[0:v]split={count}{''.join(labels)}" if count > 1 else "[0:v]null[v0]"]
+        graph += [f"{label}{background_filter(source_size, size)}[o{index}]"
+                  for index, (label, size) in enumerate(zip(labels, target_sizes))]
+
+        cmd = [FFMPEG_BINARY, "-loglevel", "error", "-stream_loop", "-1", "-i", filename,
+               "-filter_complex", ";".join(graph)]
+        pipes = [(None, None)] + [os.pipe() for _ in range(count - 1)]
+        for index, (_, write_fd) in enumerate(pipes):
+            cmd += ["-map", f"[o{index}]", "-r", "%.02f" % fps, "-frames:v", str(n_frames),
+                    "-f", "rawvideo", "-pix_fmt", "rgb24",
+                    "pipe:1" if write_fd is None else f"pipe:{write_fd}"]
+
+        write_fds = [write_fd for _, write_fd in pipes[1:]]
+        try:
+            # Unbuffered pipes: readinto() fills the ring buffers with no intermediate copy
+            self.proc = sp.Popen(cmd, pass_fds=write_fds, **cross_platform_popen_params(
+                {"stdin": sp.DEVNULL, "stdout": sp.PIPE, "stderr": sp.PIPE, "bufsize": 0}
+            ))
+        except BaseException:
+            for read_fd, write_fd in pipes[1:]:
+                os.close(read_fd)
+                os.close(write_fd)
+            raise
+        for write_fd in write_fds:
+            os.close(write_fd)
+
+        streams = [self.proc.stdout] + [open(read_fd, "rb", buffering=0) for read_fd, _ in pipes[1:]]
+        self.rings = [_FrameRing(stream, (height, width, 3), ring_size)
+                      for stream, (width, height) in zip(streams, target_sizes)]
+
+    def read(self, index=0):
+        """Next frame for target `index`. It is a ring buffer: valid until that target's following read()."""
+        frame = self.rings[index].read()
+        if frame is None:
+            error = self.proc.stderr.read().decode(errors="replace").strip() if self.proc.poll() is not None else ""
+            raise IOError(f"Background decoder ended early: {error or 'no more frames'}")
+        return frame
+
+    def close(self):
+        if self.proc is None:
+            return
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        for ring in self.rings:
+            ring.close()
+        self.proc.stderr.close()
+        self.proc = None
+
+
+class PipeFrameWriter(FFMPEG_VideoWriter):
+    """FFMPEG_VideoWriter that hands frames to ffmpeg's stdin through the buffer protocol instead of a tobytes() copy."""
+
+    def write_frame(self, img_array):
+        if img_array.dtype != np.uint8 or not img_array.flags.c_contiguous:
+            img_array = np.ascontiguousarray(img_array, dtype=np.uint8)
+        try:
+            self.proc.stdin.write(memoryview(img_array).cast("B"))
+        except IOError:
+            # The pipe is broken: MoviePy's own write_frame collects ffmpeg's error and explains it
+            super().write_frame(img_array)
+
+    def abort(self):
+        """Kills the encoder without letting it flush its buffered frames, for a file that is about to be deleted."""
+        if self.proc:
+            if self.proc.poll() is None:
+                self.proc.kill()
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                # Frames still buffered for a dead process
+                pass
+            self.proc.wait()
+            if self.proc.stderr is not None:
+                self.proc.stderr.close()
+            self.proc = None
+
+
+class FrameStats:
+    """
+    Counters for one render's frame loop: frames, bytes moved through the frame
+    buffers (decoder reads, overlay blends, encoder writes) and, while
+    tracemalloc is tracing, the transient allocation of each frame.
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes_moved = 0
+        self.alloc_bytes = 0
+        self.seconds = 0.0
+        self._start = None
+        self._traced = 0
+
+    def start(self):
+        self._start = time.perf_counter()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            self._traced = tracemalloc.get_traced_memory()[0]
+
+    def frame_done(self, bytes_moved):
+        self.frames += 1
+        self.bytes_moved += bytes_moved
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            self.alloc_bytes += max(0, peak - self._traced)
+            tracemalloc.reset_peak()
+            self._traced = current
+
+    def stop(self):
+        if self._start is not None:
+            self.seconds = time.perf_counter() - self._start
+            self._start = None
+
+    def summary(self):
+        frames = max(1, self.frames)
+        seconds = self.seconds or 1e-9
+        return {
+            "frames": self.frames,
+            "seconds": self.seconds,
+            "fps": self.frames / seconds,
+            "alloc_bytes_per_frame": self.alloc_bytes / frames,
+            "alloc_bytes_per_second": self.alloc_bytes / seconds,
+            "bytes_moved_per_frame": self.bytes_moved / frames,
+            "bytes_moved_per_second": self.bytes_moved / seconds,
+        }
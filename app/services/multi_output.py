@@ -0,0 +1,87 @@
+from app.core.config import settings
+from app.services.frame_pipe import FrameStats, PipeFrameWriter
+
+
+class OutputBranch:
+    """
+    One target of a render. It takes its frames from stream `stream_index` of
+    the job's shared ScaledVideoReader (already rotated, scaled and cropped to
+    the target size, in reused buffers), blends the overlays into that buffer
+    in place and hands it to its own encoder as is, which muxes the
+    pre-encoded audio track with a stream copy.
+    """
+
+    def __init__(self, reader, stream_index, target_size, compositor, output_path, audio_path):
+        self.reader = reader
+        self.stream_index = stream_index
+        self.target_size = target_size
+        self.compositor = compositor
+        self.output_path = output_path
+        self.writer = PipeFrameWriter(
+            output_path,
+            target_size,
+            settings.FPS,
+            codec=settings.VIDEO_CODEC,
+            audiofile=audio_path,
+            audio_codec="copy",
+            bitrate=settings.VIDEO_BITRATE,
+        )
+
+    def write(self, t):
+        """Renders the frame at `t` and returns the number of bytes it moved through memory."""
+        frame = self.reader.read(self.stream_index)
+        tile = self.compositor.tile_at(t)
+        self.compositor.composite(frame, t, out=frame)
+        self.writer.write_frame(frame)
+        # decoder -> ring buffer, ring buffer -> encoder, plus the read/write of the blended box
+        return 2 * frame.nbytes + (2 * tile.rgb.nbytes if tile is not None else 0)
+
+    def close(self):
+        """Finalizes this target's file. The shared reader belongs to the caller."""
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def abort(self):
+        """Stops this target's encoder at once; its file is incomplete and left for the caller to delete."""
+        if self.writer is not None:
+            self.writer.abort()
+            self.writer = None
+
+
+def render_outputs(branches, n_frames, fps, progress=None, cancel_token=None, stats=None):
+    """
+    Renders `n_frames` frames into every branch. `progress(percentage)` is
+    called whenever the integer percentage changes and `cancel_token` is
+    checked before every frame. Encoders are finalized once every frame is
+    written; if the loop fails or is cancelled they are killed instead, so no
+    CPU goes into flushing files that will be deleted. Returns the loop's
+    FrameStats.
+    """
+    stats = stats or FrameStats()
+    last_percentage = -1
+    completed = False
+    try:
+        stats.start()
+        for frame_index in range(n_frames):
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
+            t = frame_index / fps
+            bytes_moved = 0
+            for branch in branches:
+                bytes_moved += branch.write(t)
+            stats.frame_done(bytes_moved)
+
+            percentage = int((frame_index + 1) * 100 / n_frames)
+            if progress and percentage != last_percentage:
+                progress(percentage)
+                last_percentage = percentage
+        completed = True
+    finally:
+        stats.stop()
+        for branch in branches:
+            if completed:
+                branch.close()
+            else:
+                branch.abort()
+    return stats
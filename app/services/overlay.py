@@ -0,0 +1,154 @@
+from bisect import bisect_right
+import numpy as np
+from moviepy import VideoClip
+
+
+class OverlayTile:
+    """
+    The static overlay of one segment (an ayah's Arabic + English text),
+    pre-composed once into a premultiplied RGB tile plus inverse alpha,
+    cropped to the bounding box of its visible pixels.
+    """
+    __slots__ = ("start", "end", "x", "y", "rgb", "inv_alpha")
+
+    def __init__(self, start, end, x, y, rgb, inv_alpha):
+        self.start = start
+        self.end = end
+        self.x = x
+        self.y = y
+        self.rgb = rgb              # (h, w, 3) uint8, premultiplied by alpha
+        self.inv_alpha = inv_alpha  # (h, w, 1) uint16, 255 - alpha
+
+    @property
+    def size(self):
+        return self.rgb.shape[1], self.rgb.shape[0]
+
+    @classmethod
+    def from_layers(cls, layers, canvas_size, start, end):
+        """
+        `layers` is a list of (rgb, alpha, (x, y)) drawn bottom to top, where
+        rgb is (h, w, 3) uint8, alpha is (h, w) float in [0, 1] (or None for
+        opaque) and (x, y) is the top-left position on the canvas. Returns None
+        if nothing is visible.
+        """
+        canvas_w, canvas_h = canvas_size
+        placed = []
+        for rgb, alpha, (x, y) in layers:
+            x, y = int(x), int(y)
+            h, w = rgb.shape[:2]
+            x0, y0 = max(x, 0), max(y, 0)
+            x1, y1 = min(x + w, canvas_w), min(y + h, canvas_h)
+            if x0 < x1 and y0 < y1:
+                placed.append((rgb, alpha, x, y, x0, y0, x1, y1))
+        if not placed:
+            return None
+
+        bx0 = min(p[4] for p in placed)
+        by0 = min(p[5] for p in placed)
+        bx1 = max(p[6] for p in placed)
+        by1 = max(p[7] for p in placed)
+
+        # "Over" operator in premultiplied float space, done once per segment
+        color = np.zeros((by1 - by0, bx1 - bx0, 3), dtype=np.float32)
+        coverage = np.zeros((by1 - by0, bx1 - bx0, 1), dtype=np.float32)
+        for rgb, alpha, x, y, x0, y0, x1, y1 in placed:
+            src_rgb = rgb[y0 - y:y1 - y, x0 - x:x1 - x, :3].astype(np.float32)
+            if alpha is None:
+                src_a = np.ones(src_rgb.shape[:2] + (1,), dtype=np.float32)
+            else:
+                src_a = alpha[y0 - y:y1 - y, x0 - x:x1 - x, None].astype(np.float32)
+            dst = (slice(y0 - by0, y1 - by0), slice(x0 - bx0, x1 - bx0))
+            color[dst] = src_rgb * src_a + color[dst] * (1 - src_a)
+            coverage[dst] = src_a + coverage[dst] * (1 - src_a)
+
+        # Tighten the box to visible pixels (text clips carry generous padding)
+        visible = coverage[..., 0] > (0.5 / 255)
+        rows = np.flatnonzero(visible.any(axis=1))
+        cols = np.flatnonzero(visible.any(axis=0))
+        if rows.size == 0:
+            return None
+        r0, r1, c0, c1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+
+        rgb = np.ascontiguousarray(np.rint(color[r0:r1, c0:c1]).clip(0, 255).astype(np.uint8))
+        alpha8 = np.rint(coverage[r0:r1, c0:c1] * 255).clip(0, 255).astype(np.uint16)
+        return cls(start, end, int(bx0 + c0), int(by0 + r0), rgb, np.ascontiguousarray(255 - alpha8))
+
+    @classmethod
+    def from_clips(cls, clips, canvas_size, start, end):
+        """Same as `from_layers` for (ImageClip, (x, y)) pairs, e.g. TextClips."""
+        layers = []
+        for clip, position in clips:
+            alpha = clip.mask.get_frame(0) if clip.mask is not None else None
+            layers.append((clip.get_frame(0), alpha, position))
+        return cls.from_layers(layers, canvas_size, start, end)
+
+
+class OverlayCompositor:
+    """
+    Blends the active segment's tile over background frames, touching only
+    the tile's bounding box. All intermediate buffers are allocated once, so
+    a frame costs one copy of the background plus integer math on the box.
+
+    `composite` returns a buffer that is reused on the next call; consumers
+    must be done with a frame before requesting the next one (true for
+    `write_videofile`, which pipes each frame to ffmpeg immediately).
+    """
+
+    def __init__(self, canvas_size, tiles):
+        self.width, self.height = canvas_size
+        self.tiles = sorted((tile for tile in tiles if tile is not None), key=lambda tile: tile.start)
+        self._starts = [tile.start for tile in self.tiles]
+        self._canvas = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+
+        largest = max((tile.rgb.size for tile in self.tiles), default=0)
+        self._scratch = np.empty(largest, dtype=np.uint16)
+        self._scratch_shift = np.empty(largest, dtype=np.uint16)
+
+    def tile_at(self, t):
+        index = bisect_right(self._starts, t) - 1
+        if index >= 0 and t < self.tiles[index].end:
+            return self.tiles[index]
+        return None
+
+    def blend(self, frame, tile):
+        """Blends `tile` into `frame` in place: out = rgb + frame * (255 - alpha) / 255."""
+        h, w = tile.rgb.shape[:2]
+        box = frame[tile.y:tile.y + h, tile.x:tile.x + w]
+        acc = self._scratch[:tile.rgb.size].reshape(tile.rgb.shape)
+        shift = self._scratch_shift[:tile.rgb.size].reshape(tile.rgb.shape)
+
+        np.multiply(box, tile.inv_alpha, out=acc)
+        # Exact rounding division by 255 in 16 bits: (x + 128 + ((x + 128) >> 8)) >> 8
+        np.add(acc, 128, out=acc)
+        np.right_shift(acc, 8, out=shift)
+        np.add(acc, shift, out=acc)
+        np.right_shift(acc, 8, out=acc)
+        np.add(acc, tile.rgb, out=acc)
+        np.minimum(acc, 255, out=acc)
+        np.copyto(box, acc, casting="unsafe")
+        return frame
+
+    def composite(self, frame, t, out=None):
+        """Writes `frame` with the overlay active at `t` into `out` (default: the shared canvas)."""
+        out = self._canvas if out is None else out
+        if frame is not out:
+            if frame.shape[:2] == out.shape[:2]:
+                np.copyto(out, frame[..., :3])
+            else:
+                # Background smaller/larger than the canvas: anchor top-left like CompositeVideoClip
+                out.fill(0)
+                h = min(frame.shape[0], out.shape[0])
+                w = min(frame.shape[1], out.shape[1])
+                out[:h, :w] = frame[:h, :w, :3]
+
+        tile = self.tile_at(t)
+        if tile is not None:
+            self.blend(out, tile)
+        return out
+
+    def make_clip(self, background_clip):
+        """Wraps `background_clip` into a VideoClip with the overlays applied per frame."""
+        def frame_function(t):
+            return self.composite(background_clip.get_frame(t), t)
+
+        return VideoClip(frame_function=frame_function, duration=background_clip.duration)
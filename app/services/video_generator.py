@@ -1,81 +1,111 @@
 import os
 import requests
-from moviepy import (
-    AudioFileClip, VideoFileClip, TextClip,
-    CompositeVideoClip, concatenate_audioclips, vfx
-)
+from moviepy import TextClip
+from moviepy.config import FFMPEG_BINARY
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
 from app.models import VideoRequest, VideoPlatform
 from app.core.config import settings
-from app.core.logging import setup_logging
+from app.core.logging import setup_logging, log_context, set_log_phase
 from app.utils.arabic import formatArabicSentences
 from app.utils.file_ops import download_file, cleanup_temp_dir
-from app.utils.progress import ProgressLogger
+from app.services.overlay import OverlayTile, OverlayCompositor
+from app.services.multi_output import OutputBranch, render_outputs
+from app.services.frame_pipe import ScaledVideoReader, probe_video_size
+from app.utils.cancellation import JobCancelled
+from app.utils.resources import JobResources
 import time
+import uuid
 
 logger = setup_logging()
 
-def generate_video(request: VideoRequest, progress_callback=None) -> str:
-    def report_progress(p, msg):
-        if progress_callback:
-            progress_callback(p, msg)
-
-    report_progress(5, "status_starting")
-    
-    logger.info("=" * 80)
-    logger.info(f"Starting Quran Video Generation ({request.platform.value})")
-    logger.info(f"Surah: {request.surah}, Ayahs: {request.ayah_start}-{request.ayah_end}")
-    logger.info("=" * 80)
-    
-    # Determine Output Dimensions based on Resolution
-    res = request.resolution
-    
-    if request.platform == VideoPlatform.REEL:
+def target_dimensions(platform: VideoPlatform, resolution: int):
+    """Output (width, height) for a platform at a given resolution."""
+    if platform == VideoPlatform.REEL:
          # 9:16 aspect ratio
-        target_width = res
-        target_height = int(res * (16/9))
+        target_width = resolution
+        target_height = int(resolution * (16/9))
     else: # YOUTUBE
         # 16:9 aspect ratio
-        target_height = res
-        target_width = int(res * (16/9))
-    
+        target_height = resolution
+        target_width = int(resolution * (16/9))
+
     # Ensure dimensions are divisible by 2
     target_width = target_width - (target_width % 2)
     target_height = target_height - (target_height % 2)
-        
-    logger.info(f"Target Resolution: {target_width}x{target_height} ({request.resolution}p)")
-
-    cleanup_temp_dir(settings.TEMP_DIR)
-    os.makedirs(settings.TEMP_DIR, exist_ok=True)
-
-    output_filename = f"quran_{request.platform.value}_{request.surah}_{request.ayah_start}-{request.ayah_end}.mp4"
-    if request.request_id:
-         # Include request ID in filename to avoid collisions if concurrent (though we clean temp, output should be safe)
-         output_filename = f"quran_{request.platform.value}_{request.surah}_{request.ayah_start}-{request.ayah_end}_{request.request_id}.mp4"
-
-    output_filepath = os.path.join(settings.OUTPUT_DIR, output_filename)
-    
-    # PHASE 1: Data Fetching
-    report_progress(10, "status_fetching")
+    return target_width, target_height
+
+def _output_filepath(request: VideoRequest, job_id, platform: VideoPlatform, resolution=None, ext="mp4"):
+    name = f"quran_{platform.value}_{request.surah}_{request.ayah_start}-{request.ayah_end}"
+    if resolution is not None:
+        # Multi-output jobs can render the same platform at several resolutions
+        name = f"quran_{platform.value}_{resolution}p_{request.surah}_{request.ayah_start}-{request.ayah_end}"
+    # Job id (the request ID when given) in the filename: concurrent jobs for the same
+    # ayahs never write, or delete on cancel, each other's file
+    name = f"{name}_{job_id}"
+    return os.path.join(settings.OUTPUT_DIR, f"{name}.{ext}")
+
+def generate_video(request: VideoRequest, progress_callback=None, cancel_token=None, job_id=None) -> str:
+    # Runs on an executor thread: scope the log context to this job only
+    job_id = job_id or request.request_id or uuid.uuid4().hex
+    with log_context(job_id=job_id, phase="starting"), \
+            JobResources(job_id, cancel_token) as resources:
+        temp_dir = _job_temp_dir()
+        try:
+            return _generate_video(request, temp_dir, resources, progress_callback, cancel_token)
+        finally:
+            # Readers and encoders still open are closed (by JobResources) after this
+            cleanup_temp_dir(temp_dir)
+
+def generate_videos(request: VideoRequest, progress_callback=None, cancel_token=None, job_id=None) -> list[str]:
+    """
+    Renders every target in `request.outputs` from a single decode of the
+    sources. `job_id` (the request_id, else a generated id) tags its logs,
+    resources and output files.
+    """
+    job_id = job_id or request.request_id or uuid.uuid4().hex
+    with log_context(job_id=job_id, phase="starting"), \
+            JobResources(job_id, cancel_token) as resources:
+        temp_dir = _job_temp_dir()
+        try:
+            return _generate_videos(request, temp_dir, resources, progress_callback, cancel_token)
+        finally:
+            cleanup_temp_dir(temp_dir)
+
+def _job_temp_dir() -> str:
+    """Scratch directory private to one job, removed when it ends (success, error or cancel)."""
+    temp_dir = os.path.join(settings.TEMP_DIR, f"job_{uuid.uuid4().hex}")
+    os.makedirs(temp_dir, exist_ok=True)
+    return temp_dir
+
+def _check_cancelled(cancel_token):
+    if cancel_token:
+        cancel_token.raise_if_cancelled()
+
+def _remove_partial_output(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+def _fetch_ayahs(request: VideoRequest, temp_dir, cancel_token=None):
+    """PHASE 1: Fetches texts and downloads the recitation audio of each ayah in range."""
     quran_api_url = f"http://api.alquran.cloud/v1/surah/{request.surah}/editions/{request.reciter_id},{request.translation_id}"
-    
+
     try:
         response = requests.get(quran_api_url, timeout=10)
         response.raise_for_status()
         quran_data = response.json()
-        
+
         if 'data' not in quran_data:
             raise ValueError("API response format is unexpected - 'data' field not found")
-            
+
         if isinstance(quran_data['data'], list):
             editions = quran_data['data']
         elif isinstance(quran_data['data'], dict) and 'editions' in quran_data['data']:
             editions = quran_data['data']['editions']
         else:
             raise ValueError("Cannot find editions in API response")
-            
+
     except Exception as e:
         logger.error(f"Error fetching Quran data: {str(e)}", exc_info=True)
-        cleanup_temp_dir(settings.TEMP_DIR)
         raise e
 
     ayah_clips_info = []
@@ -85,36 +115,35 @@ def generate_video(request: VideoRequest, progress_callback=None) -> str:
     for edition_data in editions:
         edition_info = edition_data.get('edition', {})
         edition_id = edition_info.get('identifier', 'UNKNOWN')
-        
+
         if edition_id == request.reciter_id:
             arabic_edition_data = edition_data
         elif edition_id == request.translation_id:
             english_edition_data = edition_data
-    
+
     if not arabic_edition_data or not english_edition_data:
-        cleanup_temp_dir(settings.TEMP_DIR)
         raise ValueError("Could not find both Arabic and English editions in API response")
 
     for i in range(len(arabic_edition_data['ayahs'])):
         arabic_ayah = arabic_edition_data['ayahs'][i]
         english_ayah = english_edition_data['ayahs'][i]
         ayah_number_in_surah = arabic_ayah['numberInSurah']
-        
+
         if request.ayah_start <= ayah_number_in_surah <= request.ayah_end:
             arabic_text = arabic_ayah['text']
             english_text = english_ayah['text']
-            
+
             if 'audio' in arabic_ayah and arabic_ayah['audio']:
                 audio_url = arabic_ayah['audio']
             else:
                 surah_padded = str(request.surah).zfill(3)
                 ayah_padded = str(ayah_number_in_surah).zfill(3)
                 audio_url = f"https://everyayah.com/data/{request.reciter_id}/{surah_padded}{ayah_padded}.mp3"
-            
-            audio_filename = os.path.join(settings.TEMP_DIR, f"audio_{request.surah:03d}_{ayah_number_in_surah:03d}.mp3")
 
-            if not download_file(audio_url, audio_filename):
-                cleanup_temp_dir(settings.TEMP_DIR)
+            audio_filename = os.path.join(temp_dir, f"audio_{request.surah:03d}_{ayah_number_in_surah:03d}.mp3")
+
+            _check_cancelled(cancel_token)
+            if not download_file(audio_url, audio_filename, cancel_token=cancel_token):
                 raise Exception(f"Failed to download audio for Ayah {ayah_number_in_surah}")
 
             ayah_clips_info.append({
@@ -124,93 +153,78 @@ def generate_video(request: VideoRequest, progress_callback=None) -> str:
                 'duration': 0,
                 'ayah_number': ayah_number_in_surah
             })
-    
+
     if not ayah_clips_info:
-        cleanup_temp_dir(settings.TEMP_DIR)
         raise ValueError(f"No ayahs found for Surah {request.surah} in range {request.ayah_start}-{request.ayah_end}")
 
-    # PHASE 2: Video and Audio Processing
-    report_progress(20, "status_downloading")
-    background_video_filename = os.path.join(settings.TEMP_DIR, "background_video.mp4")
-    if not download_file(request.background_url, background_video_filename):
+    return ayah_clips_info
+
+def _download_background(request: VideoRequest, temp_dir, cancel_token=None) -> str:
+    background_video_filename = os.path.join(temp_dir, "background_video.mp4")
+    if not download_file(request.background_url, background_video_filename, cancel_token=cancel_token):
         # Fallback to local default if available, otherwise fail
         default_bg = 'videos/default_background.mp4'
         if os.path.exists(default_bg):
             background_video_filename = default_bg
         else:
-            cleanup_temp_dir(settings.TEMP_DIR)
             raise Exception("Failed to download background video and no local default found")
-
-    report_progress(30, "status_processing_audio")
-    audio_clips = []
+    return background_video_filename
+
+def _encode_audio(ayah_clips_info, output_path, resources: JobResources):
+    """
+    Fills in each ayah's duration and encodes the recitation into one AAC track
+    with a single ffmpeg process (instead of one open reader per ayah). Every
+    ayah is padded/trimmed to its probed duration, so overlays stay in sync.
+    Returns the total duration.
+    """
     total_audio_duration = 0
-    
-    for info in ayah_clips_info:
-        try:
-            clip = AudioFileClip(info['audio_path'])
-            info['duration'] = clip.duration
-            audio_clips.append(clip)
-            total_audio_duration += clip.duration
-        except Exception as e:
-            cleanup_temp_dir(settings.TEMP_DIR)
-            raise Exception(f"Error loading audio clip: {str(e)}")
-
-    concatenated_audio = concatenate_audioclips(audio_clips)
-
-    report_progress(40, "status_processing_video")
+    with resources.processes(1):
+        for info in ayah_clips_info:
+            _check_cancelled(resources.cancel_token)
+            try:
+                info['duration'] = ffmpeg_parse_infos(info['audio_path'])['duration']
+            except Exception as e:
+                raise Exception(f"Error loading audio clip: {str(e)}")
+            total_audio_duration += info['duration']
+
+    cmd = [FFMPEG_BINARY, "-y", "-loglevel", "error"]
+    chain = []
+    for index, info in enumerate(ayah_clips_info):
+        cmd += ["-i", info['audio_path']]
+        chain.append(f"[{index}:a]aformat=sample_rates=44100:channel_layouts=stereo,"
+                     f"apad,atrim=end={info['duration']:.6f}[a{index}]")
+    inputs = "".join(f"[a{index}]" for index in range(len(ayah_clips_info)))
+    chain.append(f"{inputs}concat=n={len(ayah_clips_info)}:v=0:a=1[audio]")
+    cmd += [
+        "-filter_complex", ";".join(chain), "-map", "[audio]",
+        "-c:a", settings.AUDIO_CODEC, "-b:a", settings.AUDIO_BITRATE, output_path,
+    ]
     try:
-        background_clip = VideoFileClip(background_video_filename)
-        # Handle Rotation if resizing to portrait but video is landscape (and vice versa)
-        is_target_portrait = target_height > target_width
-        is_bg_portrait = background_clip.h > background_clip.w
-        
-        if is_target_portrait and not is_bg_portrait:
-             background_clip = background_clip.rotated(angle=-90)
-        
+        resources.run(cmd)
+    except JobCancelled:
+        raise
     except Exception as e:
-        cleanup_temp_dir(settings.TEMP_DIR)
-        raise Exception(f"Error loading background video: {str(e)}")
+        raise Exception(f"Error encoding audio: {str(e)}")
+    return total_audio_duration
 
-    if background_clip.w != target_width or background_clip.h != target_height:
-        scale_w = target_width / background_clip.w
-        scale_h = target_height / background_clip.h
-        scale_factor = max(scale_w, scale_h)
-
-        if scale_factor > 1:
-            background_clip = background_clip.resized(scale_factor)
-
-        background_clip = background_clip.cropped(
-            x_center=background_clip.w / 2,
-            y_center=background_clip.h / 2,
-            width=target_width,
-            height=target_height
-        )
-
-    # LOOPING FIX: Use seamless loop with duration instead of concatenation
-    if background_clip.duration < total_audio_duration:
-        # MoviePy v2.0+ uses vfx.Loop effect
-        background_clip = background_clip.with_effects([vfx.Loop(duration=total_audio_duration)])
-    
-    background_clip = background_clip.subclipped(0, total_audio_duration)
-
-    # PHASE 3: Subtitle Generation
-    report_progress(50, "status_subtitles")
-    all_text_clips = []
+def _build_overlay_tiles(ayah_clips_info, platform: VideoPlatform, target_width, target_height, cancel_token=None):
+    """PHASE 3: Renders each ayah's Arabic + English text once into an overlay tile."""
+    overlay_tiles = []
     cumulative_duration = 0
-    
+
     # Scale fonts based on resolution (Reference 720p)
-    width_reference = 720 if request.platform == VideoPlatform.REEL else 1280
+    width_reference = 720 if platform == VideoPlatform.REEL else 1280
     scale_ratio = target_width / width_reference
-    
+
     TEXT_MARGIN_X = int(target_width * 0.04) # Reduced margin for wider text
     TEXT_MAX_WIDTH = target_width - (2 * TEXT_MARGIN_X)
-    
+
     ARABIC_FONT_SIZE = int(settings.FONT_SIZE * 0.7 * scale_ratio)
     ENGLISH_FONT_SIZE = int(settings.FONT_SIZE * 0.5 * scale_ratio)
     VERTICAL_SPACING = int(settings.FONT_SIZE * 0.5 * scale_ratio)
     TEXT_PADDING = int(60 * scale_ratio)
     TEXT_MARGIN = (int(10 * scale_ratio), int(10 * scale_ratio))
-    
+
     TEXT_BLOCK_Y_CENTER = target_height / 2
 
     # Approximate char width for wrapping
@@ -220,21 +234,21 @@ def generate_video(request: VideoRequest, progress_callback=None) -> str:
     WRAP_WIDTH_CHARS = max(40, int(TEXT_MAX_WIDTH / ARABIC_CHAR_WIDTH_EST))
 
     if not os.path.exists(settings.ARABIC_FONT):
-        cleanup_temp_dir(settings.TEMP_DIR)
         raise Exception(f"Arabic font file not found: {settings.ARABIC_FONT}")
 
     for info in ayah_clips_info:
+        _check_cancelled(cancel_token)
         arabic_text_raw = info['arabic_text']
         english_text_raw = info['english_text']
         ayah_duration = info['duration']
-        
+
         try:
             # TEXT FIX 1: formatting sends manually wrapped text
             arabic_text_formatted = formatArabicSentences(arabic_text_raw, width=WRAP_WIDTH_CHARS)
-            
+
             # TEXT FIX 2: Add DOUBLE vertical padding (newlines + spaces) to safely clear descenders
             arabic_text_padded = f"\n\n {arabic_text_formatted} \n\n"
-            
+
             arabic_clip = TextClip(
                 text=arabic_text_padded,
                 font_size=ARABIC_FONT_SIZE,
@@ -264,87 +278,173 @@ def generate_video(request: VideoRequest, progress_callback=None) -> str:
                 margin=TEXT_MARGIN,
             )
 
-            arabic_height = arabic_clip.h 
+            arabic_height = arabic_clip.h
             english_height = english_clip.h + TEXT_PADDING
             total_text_block_height = arabic_height + english_height + VERTICAL_SPACING
             y_start_arabic = TEXT_BLOCK_Y_CENTER - (total_text_block_height / 2)
             english_y = y_start_arabic + arabic_height + VERTICAL_SPACING
 
-            arabic_clip = arabic_clip.with_position(('center', y_start_arabic)) \
-                                    .with_start(cumulative_duration) \
-                                    .with_duration(ayah_duration)
-            
-            english_clip = english_clip.with_position(('center', english_y)) \
-                                       .with_start(cumulative_duration) \
-                                       .with_duration(ayah_duration)
-
-            all_text_clips.extend([arabic_clip, english_clip])
+            # Pre-compose both texts into one tile for the whole ayah instead of
+            # re-blending two masked clips over the full canvas on every frame
+            overlay_tiles.append(OverlayTile.from_clips(
+                [(arabic_clip, ((target_width - arabic_clip.w) / 2, y_start_arabic)),
+                 (english_clip, ((target_width - english_clip.w) / 2, english_y))],
+                (target_width, target_height),
+                start=cumulative_duration,
+                end=cumulative_duration + ayah_duration,
+            ))
+            arabic_clip.close()
+            english_clip.close()
             cumulative_duration += ayah_duration
 
         except Exception as e:
-            cleanup_temp_dir(settings.TEMP_DIR)
             raise Exception(f"Error creating text clips: {str(e)}")
 
-    # PHASE 4: Final Composition
-    os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
-    report_progress(70, "status_rendering")
-    
-    logger.info(f"Total Video Duration Calculation: Audio={total_audio_duration}s, Background={background_clip.duration}s")
-    
-    try:
-        final_video_clip = CompositeVideoClip([background_clip] + all_text_clips,
-                                              size=(target_width, target_height))
-        final_video_clip = final_video_clip.with_audio(concatenated_audio)
-        
-        # FORCE DURATION: Explicitly set and subclip to be safe
-        final_video_clip = final_video_clip.with_duration(total_audio_duration)
-        final_video_clip = final_video_clip.subclipped(0, total_audio_duration)
-        
-        logger.info(f"Final Export Duration: {final_video_clip.duration}s")
-        
-        # Optimize for Rendering on Free Tier (Low Memory/CPU)
-        temp_audio_path = os.path.join(settings.TEMP_DIR, "temp-audio.m4a")
-
-        # Setup Custom Logger
-        video_logger = 'bar'
+    return overlay_tiles
+
+def _make_report_progress(progress_callback, cancel_token=None):
+    def report_progress(p, msg):
+        # Phase boundaries double as cancellation checkpoints
+        _check_cancelled(cancel_token)
+        set_log_phase(msg.removeprefix("status_"))
         if progress_callback:
-            def rendering_progress(p=None, msg=None, **kwargs):
-                if p is not None:
-                    # Map rendering progress (0-100) to global progress (70-100)
-                    global_p = 70 + int(p * 0.3)
-                    # Instead of hardcoding, send key + percentage in a way frontend can parse?
-                    # Easiest way: just send key "status_rendering" and frontend handles append
-                    progress_callback(global_p, "status_rendering")
-                elif msg:
-                    # ignore internal messages
-                    pass 
-            video_logger = ProgressLogger(callback=rendering_progress)
-
-        final_video_clip.write_videofile(
-            output_filepath,
-            fps=settings.FPS,
-            codec=settings.VIDEO_CODEC,
-            audio_codec=settings.AUDIO_CODEC,
-            bitrate=settings.VIDEO_BITRATE,
-            audio_bitrate=settings.AUDIO_BITRATE,
-            logger=video_logger,
-            temp_audiofile=temp_audio_path,
-            remove_temp=True
-        )
-        
-        report_progress(100, "status_completed")
-        
-        # Cleanup clips explicitly to free resources
-        try:
-            final_video_clip.close()
-            # Explicitly close sub-clips if possible, though Composite logic handles some
-            background_clip.close()
-            concatenated_audio.close()
-        except:
-            pass
-            
-        return output_filepath
+            progress_callback(p, msg)
+    return report_progress
+
+def _generate_video(request: VideoRequest, temp_dir, resources: JobResources, progress_callback=None, cancel_token=None) -> str:
+    report_progress = _make_report_progress(progress_callback, cancel_token)
+
+    report_progress(5, "status_starting")
+
+    logger.info(f"Starting Quran Video Generation ({request.platform.value}): "
+                f"Surah {request.surah}, Ayahs {request.ayah_start}-{request.ayah_end}")
+
+    # Determine Output Dimensions based on Resolution
+    target_width, target_height = target_dimensions(request.platform, request.resolution)
+
+    logger.info(f"Target Resolution: {target_width}x{target_height} ({request.resolution}p)")
+
+    targets = [(request.platform, request.resolution, _output_filepath(request, resources.job_id, request.platform))]
+    return _render_targets(request, temp_dir, resources, targets, report_progress, progress_callback, cancel_token)[0]
 
+def _generate_videos(request: VideoRequest, temp_dir, resources: JobResources, progress_callback=None, cancel_token=None) -> list[str]:
+    report_progress = _make_report_progress(progress_callback, cancel_token)
+
+    report_progress(5, "status_starting")
+
+    # Duplicate targets would render the same file twice
+    targets = list(dict.fromkeys((o.platform, o.resolution) for o in request.outputs))
+    # The render phase runs the shared decoder and one encoder per target at once: refuse before fetching anything
+    if len(targets) + 1 > resources.budget.limit:
+        raise ValueError(f"{len(targets)} outputs need {len(targets) + 1} ffmpeg processes at once, "
+                         f"more than MAX_FFMPEG_PROCESSES={resources.budget.limit}")
+    logger.info(f"Starting multi-output Quran Video Generation: Surah {request.surah}, "
+                f"Ayahs {request.ayah_start}-{request.ayah_end}, "
+                f"targets={[f'{p.value}@{r}p' for p, r in targets]}")
+
+    targets = [(platform, resolution, _output_filepath(request, resources.job_id, platform, resolution))
+               for platform, resolution in targets]
+    return _render_targets(request, temp_dir, resources, targets, report_progress, progress_callback, cancel_token)
+
+def _render_targets(request: VideoRequest, temp_dir, resources: JobResources, targets, report_progress,
+                    progress_callback=None, cancel_token=None) -> list[str]:
+    """
+    Renders each (platform, resolution, output path) target. Sources are fetched,
+    the audio encoded and the background decoded once; the decoder splits each
+    frame into per-target scaled streams that reach the encoders in reused buffers.
+    """
+    # PHASE 1: Data Fetching (shared by all targets)
+    report_progress(10, "status_fetching")
+    ayah_clips_info = _fetch_ayahs(request, temp_dir, cancel_token)
+
+    # PHASE 2: Background download, audio decoded and AAC-encoded once
+    report_progress(20, "status_downloading")
+    background_video_filename = _download_background(request, temp_dir, cancel_token)
+
+    report_progress(30, "status_processing_audio")
+    temp_audio_path = os.path.join(temp_dir, "temp-audio.m4a")
+    total_audio_duration = _encode_audio(ayah_clips_info, temp_audio_path, resources)
+
+    report_progress(40, "status_processing_video")
+    try:
+        with resources.processes(1):
+            source_size = probe_video_size(background_video_filename)
+    except JobCancelled:
+        raise
     except Exception as e:
-        cleanup_temp_dir(settings.TEMP_DIR)
-        raise Exception(f"Error during video export: {str(e)}")
+        raise Exception(f"Error loading background video: {str(e)}")
+    n_frames = int(total_audio_duration * settings.FPS)
+
+    # PHASE 3: Subtitle Generation (per target: fonts scale with the output size)
+    report_progress(50, "status_subtitles")
+    compositors = []
+    for platform, resolution, output_filepath in targets:
+        target_size = target_dimensions(platform, resolution)
+        overlay_tiles = _build_overlay_tiles(ayah_clips_info, platform, *target_size, cancel_token)
+        compositors.append((target_size, OverlayCompositor(target_size, overlay_tiles)))
+
+    # PHASE 4: Final Composition. One decoder feeds every target's encoder;
+    # all of them are reserved from the node-wide ffmpeg budget at once
+    os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
+    reader = None
+    branches = []
+    with resources.processes(len(targets) + 1):
+        try:
+            reader = resources.track(ScaledVideoReader(
+                background_video_filename,
+                source_size,
+                [target_size for target_size, _ in compositors],
+                settings.FPS,
+                n_frames,
+            ))
+            for index, ((platform, resolution, output_filepath), (target_size, compositor)) in enumerate(zip(targets, compositors)):
+                branches.append(resources.track(OutputBranch(
+                    reader,
+                    index,
+                    target_size,
+                    compositor,
+                    output_filepath,
+                    temp_audio_path,
+                )))
+
+            report_progress(70, "status_rendering")
+            logger.info(f"Rendering {len(branches)} output(s), duration {total_audio_duration}s "
+                        f"({n_frames} frames), background {source_size[0]}x{source_size[1]}")
+
+            def rendering_progress(p):
+                # Map rendering progress (0-100) to global progress (70-100)
+                if progress_callback:
+                    progress_callback(70 + int(p * 0.3), "status_rendering")
+
+            try:
+                stats = render_outputs(branches, n_frames, settings.FPS, rendering_progress, cancel_token)
+            except JobCancelled:
+                raise
+            except Exception as e:
+                raise Exception(f"Error during video export: {str(e)}")
+
+        except BaseException:
+            # Encoders already started are killed (not finalized) and their partial files dropped
+            for branch in branches:
+                branch.abort()
+                resources.release(branch)
+                _remove_partial_output(branch.output_path)
+            raise
+        finally:
+            for branch in branches:
+                resources.release(branch)
+            if reader is not None:
+                resources.release(reader)
+
+    summary = stats.summary()
+    logger.info(f"Frame loop: {summary['frames']} frames at {summary['fps']:.1f} fps, "
+                f"{summary['bytes_moved_per_frame'] / 1e6:.1f} MB moved per frame")
+
+    try:
+        report_progress(100, "status_completed")
+    except JobCancelled:
+        # Cancelled while the encoders were finalizing: the finished files are not wanted either
+        for branch in branches:
+            _remove_partial_output(branch.output_path)
+        raise
+    return [branch.output_path for branch in branches]
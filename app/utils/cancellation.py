@@ -0,0 +1,45 @@
+import threading
+import time
+
+# Reasons a job can be cancelled for
+CLIENT_DISCONNECTED = "client_disconnected"
+DELETED = "deleted"
+DEADLINE = "deadline"
+ABANDONED = "abandoned"
+
+
+class JobCancelled(Exception):
+    """Raised inside a render when its CancellationToken has been triggered."""
+
+    def __init__(self, reason):
+        super().__init__(f"Job cancelled ({reason})")
+        self.reason = reason
+
+
+class CancellationToken:
+    """
+    Thread-safe flag shared between the request handler (which cancels it on
+    client disconnect, DELETE /jobs/{id}, deadline, or when the handler itself
+    is cancelled) and the render thread (which calls `raise_if_cancelled`
+    between units of work).
+    """
+
+    def __init__(self, timeout=None):
+        self._event = threading.Event()
+        self.reason = None
+        self.deadline = time.monotonic() + timeout if timeout else None
+
+    def cancel(self, reason):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self):
+        if not self._event.is_set() and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel(DEADLINE)
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled(self.reason)
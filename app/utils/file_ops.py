@@ -5,8 +5,8 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-def download_file(url, local_filename):
-    """Downloads a file from a URL to a local path."""
+def download_file(url, local_filename, cancel_token=None):
+    """Downloads a file from a URL to a local path. Stops between chunks if `cancel_token` is cancelled."""
     os.makedirs(os.path.dirname(local_filename), exist_ok=True)
     try:
         headers = {
@@ -16,6 +16,8 @@ def download_file(url, local_filename):
             r.raise_for_status()
             with open(local_filename, 'wb') as f:
                 for chunk in r.iter_content(chunk_size=8192):
+                    if cancel_token:
+                        cancel_token.raise_if_cancelled()
                     if chunk:
                         f.write(chunk)
             return True
@@ -0,0 +1,169 @@
+import subprocess as sp
+import threading
+import weakref
+from contextlib import contextmanager
+
+from moviepy.tools import cross_platform_popen_params
+from app.core.config import settings
+from app.core.logging import setup_logging
+
+logger = setup_logging()
+
+
+class ProcessBudget:
+    """
+    Node-wide cap on concurrent ffmpeg processes. A job reserves every slot a
+    phase needs in one step, so two jobs holding part of what they need can
+    never wait on each other. A phase that needs more than the whole budget
+    could never run, so asking for one is an error.
+    """
+
+    def __init__(self, limit):
+        self.limit = max(1, limit)
+        self.in_use = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, count, cancel_token=None):
+        """Blocks until `count` slots are free (checking `cancel_token` meanwhile) and returns the number taken."""
+        if count > self.limit:
+            raise ValueError(f"Needs {count} ffmpeg processes at once, more than MAX_FFMPEG_PROCESSES={self.limit}")
+        with self._condition:
+            self.waiting += 1
+            try:
+                while self.in_use + count > self.limit:
+                    if cancel_token:
+                        cancel_token.raise_if_cancelled()
+                    self._condition.wait(timeout=0.5)
+            finally:
+                self.waiting -= 1
+            self.in_use += count
+        return count
+
+    def release(self, count):
+        with self._condition:
+            self.in_use -= count
+            self._condition.notify_all()
+
+
+ffmpeg_budget = ProcessBudget(settings.MAX_FFMPEG_PROCESSES)
+
+# Jobs currently holding resources, for live counts
+_active_jobs = weakref.WeakSet()
+
+
+class JobResources:
+    """
+    Everything a job opens that holds an ffmpeg process or file descriptors
+    (readers, writers, subprocesses). Whatever is still open when the job ends
+    (success, error or cancel) is closed in reverse order of opening.
+    """
+
+    def __init__(self, job_id=None, cancel_token=None, budget=None):
+        self.job_id = job_id
+        self.cancel_token = cancel_token
+        self.budget = budget or ffmpeg_budget
+        self.reserved = 0
+        self._open = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        _active_jobs.add(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        _active_jobs.discard(self)
+
+    @contextmanager
+    def processes(self, count):
+        """Reserves `count` ffmpeg slots from the budget for the duration of the block."""
+        taken = self.budget.acquire(count, self.cancel_token)
+        with self._lock:
+            self.reserved += taken
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.reserved -= taken
+            self.budget.release(taken)
+
+    def track(self, resource):
+        """Registers an object with a close() method; returns it."""
+        with self._lock:
+            self._open.append(resource)
+        return resource
+
+    def release(self, resource):
+        """Closes a tracked resource now rather than at the end of the job."""
+        with self._lock:
+            if resource in self._open:
+                self._open.remove(resource)
+        _close(resource)
+
+    def run(self, cmd):
+        """
+        Runs a short-lived ffmpeg command in one budget slot. It is killed if
+        the job is cancelled; a non-zero exit raises with ffmpeg's error output.
+        """
+        with self.processes(1):
+            proc = sp.Popen(cmd, **cross_platform_popen_params(
+                {"stdin": sp.DEVNULL, "stdout": sp.DEVNULL, "stderr": sp.PIPE}
+            ))
+            process = self.track(_Process(proc))
+            try:
+                while True:
+                    try:
+                        _, stderr = proc.communicate(timeout=0.25)
+                        break
+                    except sp.TimeoutExpired:
+                        if self.cancel_token:
+                            self.cancel_token.raise_if_cancelled()
+            finally:
+                self.release(process)
+        if proc.returncode != 0:
+            raise IOError(stderr.decode(errors="replace").strip() or f"ffmpeg exited with {proc.returncode}")
+
+    def close(self):
+        with self._lock:
+            resources, self._open = self._open[::-1], []
+        for resource in resources:
+            _close(resource)
+
+    def counts(self):
+        with self._lock:
+            return {"open": len(self._open), "processes": self.reserved}
+
+
+class _Process:
+    """close() for a bare Popen: kill it if still running and reap it."""
+
+    def __init__(self, proc):
+        self.proc = proc
+
+    def close(self):
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        if self.proc.stderr is not None:
+            self.proc.stderr.close()
+
+
+def _close(resource):
+    try:
+        resource.close()
+    except Exception as e:
+        logger.warning(f"Error closing {type(resource).__name__}: {e}")
+
+
+def resource_counts():
+    """Live ffmpeg budget usage and open resources, node-wide and per job."""
+    jobs = [{"job_id": job.job_id, **job.counts()} for job in list(_active_jobs)]
+    return {
+        "ffmpeg_limit": ffmpeg_budget.limit,
+        "ffmpeg_in_use": ffmpeg_budget.in_use,
+        "ffmpeg_waiting": ffmpeg_budget.waiting,
+        "jobs": len(jobs),
+        "open_resources": sum(job["open"] for job in jobs),
+        "by_job": jobs,
+    }
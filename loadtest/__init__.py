@@ -0,0 +1,9 @@
+"""
+Load-testing harness for the Quran Video Generator API.
+
+Starts the FastAPI app in-process with stubbed upstreams (Quran API, audio
+and background downloads) and drives configurable arrival patterns of
+`POST /generate-video` calls plus SSE subscribers to `/progress/{request_id}`.
+
+Run with: python -m loadtest --help
+"""
@@ -0,0 +1,74 @@
+import argparse
+import json
+import sys
+
+from loadtest.metrics import format_report
+from loadtest.runner import LoadTest, LoadTestConfig, PATTERNS
+from loadtest.stubs import calibrate_fake_renderer
+
+
+def parse_args(argv=None):
+    defaults = LoadTestConfig()
+    parser = argparse.ArgumentParser(
+        prog="python -m loadtest",
+        description="Drive concurrent video requests and SSE subscribers against a local app instance.",
+    )
+    parser.add_argument("-n", "--requests", type=int, default=defaults.requests)
+    parser.add_argument("--pattern", choices=PATTERNS, default=defaults.pattern)
+    parser.add_argument("--rate", type=float, default=defaults.rate, help="arrivals/s for constant and poisson")
+    parser.add_argument("--ayahs", type=int, default=defaults.ayahs_per_request, help="ayahs per request")
+    parser.add_argument("--platform", choices=["reel", "youtube"], default=defaults.platform)
+    parser.add_argument("--resolution", type=int, choices=[360, 480, 720, 1080], default=defaults.resolution)
+    parser.add_argument("--no-sse", action="store_true", help="do not open SSE subscribers")
+    parser.add_argument("--renderer", choices=["fake", "real"], default=defaults.renderer)
+    parser.add_argument("--calibrate", action="store_true",
+                        help="time one real render first and size the fake renderer from it")
+    parser.add_argument("--seconds-per-ayah", type=float, default=defaults.seconds_per_ayah)
+    parser.add_argument("--cpu-fraction", type=float, default=defaults.cpu_fraction)
+    parser.add_argument("--ayah-seconds", type=float, default=defaults.ayah_seconds)
+    parser.add_argument("--upstream-latency", type=float, default=defaults.upstream_latency)
+    parser.add_argument("--timeout", type=float, default=defaults.request_timeout)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--json", metavar="PATH", help="also write the raw report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = LoadTestConfig(
+        requests=args.requests,
+        pattern=args.pattern,
+        rate=args.rate,
+        ayahs_per_request=args.ayahs,
+        platform=args.platform,
+        resolution=args.resolution,
+        subscribe=not args.no_sse,
+        renderer=args.renderer,
+        seconds_per_ayah=args.seconds_per_ayah,
+        cpu_fraction=args.cpu_fraction,
+        ayah_seconds=args.ayah_seconds,
+        upstream_latency=args.upstream_latency,
+        request_timeout=args.timeout,
+        seed=args.seed,
+    )
+
+    renderer = None
+    if args.calibrate and config.renderer == "fake":
+        renderer = calibrate_fake_renderer(config.ayahs_per_request, config.ayah_seconds, config.resolution)
+        config.seconds_per_ayah = renderer.seconds_per_ayah
+        config.cpu_fraction = renderer.cpu_fraction
+        print(f"Calibrated fake renderer: {renderer.seconds_per_ayah:.2f}s/ayah, "
+              f"cpu_fraction={renderer.cpu_fraction:.2f}")
+
+    report = LoadTest(config, renderer).run()
+    print(format_report(report))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    return 0 if report['ok'] == report['requests'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
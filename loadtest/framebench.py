@@ -0,0 +1,154 @@
+"""
+Frame pipeline benchmark. Renders a synthetic background with ayah overlays at
+one target size twice:
+
+- "moviepy": the clip chain the service used before (decode at source size,
+  rotate/resize/crop per frame, composite, tobytes() into ffmpeg);
+- "frame pipe": target-size decoder, ring of reused buffers, in-place blend,
+  memoryview writes (what the service renders with now);
+
+and reports throughput, allocation per frame (peak transient traced memory,
+tracemalloc) and bytes moved through frame buffers per frame.
+
+    python -m loadtest.framebench --platform reel --resolution 1080 --seconds 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+from moviepy import VideoFileClip, vfx
+from proglog import ProgressBarLogger
+
+from app.core.config import settings
+from app.models import VideoPlatform
+from app.services.frame_pipe import FrameStats, ScaledVideoReader, probe_video_size
+from app.services.multi_output import OutputBranch, render_outputs
+from app.services.overlay import OverlayCompositor
+from app.services.video_generator import _build_overlay_tiles, target_dimensions
+from loadtest.stubs import FIXTURES_DIR, SAMPLE_ARABIC, SAMPLE_ENGLISH, _ffmpeg_binary
+
+
+def ensure_background(size="1280x720", seconds=4):
+    """A testsrc2 background at `size` (a typical stock-footage resolution by default)."""
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    path = os.path.join(FIXTURES_DIR, f"bench_background_{size}.mp4")
+    if not os.path.exists(path):
+        subprocess.run([
+            _ffmpeg_binary(), "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"testsrc2=size={size}:rate=24:duration={seconds}",
+            "-c:v", "libx264", "-pix_fmt", "yuv420p", path,
+        ], check=True)
+    return path
+
+
+class _FrameStatsLogger(ProgressBarLogger):
+    """Feeds write_videofile's per-frame progress into a FrameStats."""
+
+    def __init__(self, stats):
+        super().__init__()
+        self.stats = stats
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        if bar == "frame_index" and attr == "index" and value >= 0:
+            self.stats.frame_done(0)
+
+
+def _compositor(platform, target_size, seconds):
+    info = [{'arabic_text': SAMPLE_ARABIC, 'english_text': SAMPLE_ENGLISH, 'duration': seconds}]
+    return OverlayCompositor(target_size, _build_overlay_tiles(info, platform, *target_size))
+
+
+def bench_moviepy(background, platform, target_size, seconds, output_path):
+    target_width, target_height = target_size
+    clip = VideoFileClip(background, audio=False)
+    source = clip
+    if target_height > target_width and not clip.h > clip.w:
+        clip = clip.rotated(angle=-90)
+    if (clip.w, clip.h) != target_size:
+        scale_factor = max(target_width / clip.w, target_height / clip.h)
+        if scale_factor > 1:
+            clip = clip.resized(scale_factor)
+        clip = clip.cropped(x_center=clip.w / 2, y_center=clip.h / 2, width=target_width, height=target_height)
+    if clip.duration < seconds:
+        clip = clip.with_effects([vfx.Loop(duration=seconds)])
+    clip = _compositor(platform, target_size, seconds).make_clip(clip.subclipped(0, seconds))
+
+    stats = FrameStats()
+    stats.start()
+    try:
+        clip.write_videofile(output_path, fps=settings.FPS, codec=settings.VIDEO_CODEC,
+                             bitrate=settings.VIDEO_BITRATE, audio=False, logger=_FrameStatsLogger(stats))
+    finally:
+        stats.stop()
+        source.close()
+    return stats
+
+
+def bench_frame_pipe(background, platform, target_size, seconds, output_path):
+    n_frames = int(seconds * settings.FPS)
+    reader = ScaledVideoReader(background, probe_video_size(background), [target_size], settings.FPS, n_frames)
+    try:
+        branch = OutputBranch(reader, 0, target_size, _compositor(platform, target_size, seconds), output_path, None)
+        return render_outputs([branch], n_frames, settings.FPS)
+    finally:
+        reader.close()
+
+
+def _mb(value):
+    return f"{value / 1e6:9.2f}"
+
+
+def format_results(results):
+    lines = [
+        f"{'path':<12} {'fps':>7} {'alloc MB/frame':>15} {'alloc MB/s':>11} "
+        f"{'moved MB/frame':>15} {'moved MB/s':>11}",
+    ]
+    for name, summary in results.items():
+        moved = summary['bytes_moved_per_frame']
+        lines.append(
+            f"{name:<12} {summary['fps']:7.1f} {_mb(summary['alloc_bytes_per_frame']):>15} "
+            f"{_mb(summary['alloc_bytes_per_second']):>11} "
+            f"{_mb(moved) if moved else 'n/a':>15} "
+            f"{_mb(summary['bytes_moved_per_second']) if moved else 'n/a':>11}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m loadtest.framebench", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--platform", choices=["reel", "youtube"], default="reel")
+    parser.add_argument("--resolution", type=int, choices=[360, 480, 720, 1080], default=720)
+    parser.add_argument("--source", default="1280x720", help="background size, WxH")
+    parser.add_argument("--seconds", type=float, default=4.0)
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    platform = VideoPlatform(args.platform)
+    target_size = target_dimensions(platform, args.resolution)
+    background = ensure_background(args.source)
+    print(f"Frame pipeline: {args.source} background -> {args.platform} "
+          f"{target_size[0]}x{target_size[1]}, {args.seconds}s at {settings.FPS} fps")
+
+    results = {}
+    tracemalloc.start()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for name, bench in (("moviepy", bench_moviepy), ("frame pipe", bench_frame_pipe)):
+                stats = bench(background, platform, target_size, args.seconds, os.path.join(directory, "out.mp4"))
+                results[name] = stats.summary()
+    finally:
+        tracemalloc.stop()
+
+    print(format_results(results))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import math
+import os
+import resource
+import sys
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile; returns None for an empty sample."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values):
+    """Count, p50/p90/p99 and max of a list of numbers."""
+    return {
+        'count': len(values),
+        'p50': percentile(values, 50),
+        'p90': percentile(values, 90),
+        'p99': percentile(values, 99),
+        'max': max(values) if values else None,
+    }
+
+
+def _proc_status(pid):
+    """Fields of /proc/<pid>/status as strings, or None if the process is gone or /proc is unavailable."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            return dict(line.rstrip("\n").split(":\t", 1) for line in f if ":\t" in line)
+    except OSError:
+        return None
+
+
+def _rss_bytes(status):
+    # VmRSS is missing for zombies (exited, not yet reaped)
+    value = status.get("VmRSS") if status else None
+    return int(value.split()[0]) * 1024 if value else 0
+
+
+def current_rss_bytes():
+    """Resident set size of this process, or None where /proc is unavailable."""
+    status = _proc_status("self")
+    return _rss_bytes(status) if status else None
+
+
+def children_rss_bytes():
+    """
+    Combined resident set size of this process's live children (the ffmpeg
+    decoders and encoders of a real render), or None where /proc is unavailable.
+    """
+    try:
+        pids = [entry for entry in os.listdir("/proc") if entry.isdigit()]
+    except OSError:
+        return None
+    parent = str(os.getpid())
+    total = 0
+    for pid in pids:
+        status = _proc_status(pid)
+        if status and status.get("PPid", "").strip() == parent:
+            total += _rss_bytes(status)
+    return total
+
+
+def peak_rss_bytes():
+    """High-water mark of the resident set size as reported by the kernel."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def open_fd_count():
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def _fmt_ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.1f}ms"
+
+
+def _fmt_mib(value):
+    return f"{value / (1024 * 1024):.1f} MiB"
+
+
+def _fmt_summary(summary):
+    return (f"n={summary['count']} p50={_fmt_ms(summary['p50'])} p90={_fmt_ms(summary['p90'])} "
+            f"p99={_fmt_ms(summary['p99'])} max={_fmt_ms(summary['max'])}")
+
+
+def format_report(report):
+    """Renders the dict returned by `LoadTest.run` as a plain-text table."""
+    cfg = report['config']
+    lines = [
+        "=" * 72,
+        f"Load test: {cfg['requests']} requests, pattern={cfg['pattern']} rate={cfg['rate']}/s, "
+        f"renderer={cfg['renderer']}, {cfg['platform']} {cfg['resolution']}p, "
+        f"{cfg['ayahs_per_request']} ayah(s)/request",
+        "=" * 72,
+        f"Duration:          {report['duration_s']:.2f}s",
+        f"Completed:         {report['ok']}/{report['requests']} "
+        f"(error rate {report['error_rate'] * 100:.1f}%)",
+        f"Throughput:        {report['throughput_rps']:.3f} videos/s",
+        f"POST latency:      {_fmt_summary(report['latency'])}",
+        f"Event-loop lag:    {_fmt_summary(report['event_loop_lag'])}",
+        f"SSE subscribers:   {report['sse']['subscribers']} "
+        f"(completed {report['sse']['completed']}, events {report['sse']['events']})",
+        f"SSE delivery:      {_fmt_summary(report['sse']['delivery_delay'])}",
+        f"Progress queues:   peak {report['queues']['peak_open']} open, "
+        f"peak {report['queues']['peak_pending_events']} pending events",
+        f"Open descriptors:  peak {report['peak_open_fds']}",
+        f"ffmpeg processes:  peak {report['ffmpeg']['peak_in_use']}/{report['ffmpeg']['limit']} in use, "
+        f"peak {report['ffmpeg']['peak_waiting']} job(s) waiting",
+        f"Peak RSS:          {_fmt_mib(report['peak_total_rss_bytes'])} combined "
+        f"(server {_fmt_mib(report['peak_rss_bytes'])}, ffmpeg children {_fmt_mib(report['peak_children_rss_bytes'])})",
+    ]
+    if report['errors']:
+        lines.append("Errors:")
+        for error, count in sorted(report['errors'].items(), key=lambda item: -item[1]):
+            lines.append(f"  {count:4d}  {error}")
+    return "\n".join(lines)
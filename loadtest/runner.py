@@ -0,0 +1,293 @@
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from dataclasses import dataclass, asdict
+from unittest import mock
+
+import requests
+import uvicorn
+
+from app.core.config import settings
+from app.utils.resources import resource_counts
+from loadtest.metrics import summarize, children_rss_bytes, current_rss_bytes, peak_rss_bytes, open_fd_count
+from loadtest.stubs import FakeRenderer, real_renderer, stub_upstreams
+
+PATTERNS = ("burst", "constant", "poisson")
+
+
+@dataclass
+class LoadTestConfig:
+    requests: int = 20
+    pattern: str = "burst"          # burst | constant | poisson
+    rate: float = 2.0               # arrivals per second for constant/poisson
+    ayahs_per_request: int = 1
+    platform: str = "reel"
+    resolution: int = 360
+    subscribe: bool = True          # open one SSE subscriber per request
+    renderer: str = "fake"          # fake | real
+    seconds_per_ayah: float = 2.0   # fake renderer wall time per ayah
+    cpu_fraction: float = 0.3       # fake renderer share of time holding the GIL
+    ayah_seconds: float = 2.0       # audio length of one stubbed ayah
+    upstream_latency: float = 0.0   # added delay of each stubbed upstream call
+    request_timeout: float = 600.0
+    lag_interval: float = 0.05      # event-loop probe period
+    sample_interval: float = 0.1    # RSS / queue sampling period
+    seed: int = 0
+
+
+def arrival_offsets(config):
+    """Start offsets (seconds from t=0) of each request for the configured pattern."""
+    if config.pattern not in PATTERNS:
+        raise ValueError(f"Unknown arrival pattern '{config.pattern}', expected one of {PATTERNS}")
+    if config.pattern == "burst":
+        return [0.0] * config.requests
+    if config.pattern == "constant":
+        return [i / config.rate for i in range(config.requests)]
+
+    rng = random.Random(config.seed)
+    offsets, t = [], 0.0
+    for _ in range(config.requests):
+        offsets.append(t)
+        t += rng.expovariate(config.rate)
+    return offsets
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class AppServer:
+    """Runs the FastAPI app with uvicorn on a background thread and probes its event-loop lag."""
+
+    def __init__(self, app, lag_interval=0.05):
+        self.port = _free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.lag_interval = lag_interval
+        self.lag_samples = []
+        self.server = uvicorn.Server(uvicorn.Config(
+            app, host="127.0.0.1", port=self.port, log_level="warning", lifespan="off"
+        ))
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True)
+
+    async def _probe_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.lag_interval)
+            self.lag_samples.append(max(0.0, loop.time() - start - self.lag_interval))
+
+    async def _serve(self):
+        probe = asyncio.create_task(self._probe_lag())
+        try:
+            await self.server.serve()
+        finally:
+            probe.cancel()
+
+    def start(self, timeout=10):
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("Load-test server failed to start")
+            time.sleep(0.05)
+
+    def stop(self):
+        self.server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+class LoadTest:
+    def __init__(self, config: LoadTestConfig, renderer=None):
+        self.config = config
+        if renderer is None:
+            if config.renderer == "real":
+                renderer = real_renderer()
+            else:
+                renderer = FakeRenderer(config.seconds_per_ayah, config.cpu_fraction, config.ayah_seconds)
+        self.renderer = renderer
+
+        self._lock = threading.Lock()
+        self.results = []
+        self.emitted = {}       # request_id -> [emit time of each progress event]
+        self.received = {}      # request_id -> [(receive time, payload)]
+        # (rss bytes, open queues, pending events, open fds, ffmpeg in use, ffmpeg waiting, children rss bytes)
+        self.samples = []
+
+    def _instrumented_renderer(self, request, progress_callback=None, cancel_token=None, job_id=None):
+        emitted = self.emitted.setdefault(request.request_id, [])
+
+        def callback(percentage, message):
+            emitted.append(time.perf_counter())
+            if progress_callback:
+                progress_callback(percentage, message)
+
+        return self.renderer(request, callback, cancel_token, job_id)
+
+    def _payload(self, request_id):
+        return {
+            "surah": 108,
+            "ayah_start": 1,
+            "ayah_end": self.config.ayahs_per_request,
+            "platform": self.config.platform,
+            "resolution": self.config.resolution,
+            "request_id": request_id,
+        }
+
+    def _subscribe(self, base_url, request_id, ready):
+        events = self.received.setdefault(request_id, [])
+        try:
+            with requests.get(f"{base_url}{settings.API_V1_STR}/progress/{request_id}",
+                              stream=True, timeout=self.config.request_timeout) as resp:
+                ready.set()
+                for line in resp.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data: "):
+                        continue
+                    data = json.loads(line[len("data: "):])
+                    events.append((time.perf_counter(), data))
+                    if data.get("status") == "complete" or "error" in data:
+                        break
+        except requests.RequestException as e:
+            events.append((time.perf_counter(), {"error": f"subscriber: {type(e).__name__}"}))
+        finally:
+            ready.set()
+
+    def _run_job(self, base_url, index):
+        request_id = f"load-{index}-{uuid.uuid4().hex[:8]}"
+        subscriber = None
+        if self.config.subscribe:
+            ready = threading.Event()
+            subscriber = threading.Thread(target=self._subscribe, args=(base_url, request_id, ready), daemon=True)
+            subscriber.start()
+            ready.wait(timeout=5)
+
+        start = time.perf_counter()
+        error = None
+        try:
+            resp = requests.post(f"{base_url}{settings.API_V1_STR}/generate-video",
+                                 json=self._payload(request_id), timeout=self.config.request_timeout)
+            resp.content
+            if resp.status_code != 200:
+                error = f"HTTP {resp.status_code}: {resp.text[:120]}"
+        except requests.RequestException as e:
+            error = f"{type(e).__name__}: {e}"
+        latency = time.perf_counter() - start
+
+        if subscriber:
+            subscriber.join(timeout=self.config.request_timeout)
+
+        with self._lock:
+            self.results.append({'request_id': request_id, 'latency': latency, 'error': error})
+
+    def _sample(self, stop):
+        from app.api.v1.endpoints import progress_store
+
+        while not stop.is_set():
+            queues = list(progress_store.values())
+            resources = resource_counts()
+            self.samples.append((
+                current_rss_bytes() or 0,
+                len(queues),
+                sum(q.qsize() for q in queues),
+                open_fd_count() or 0,
+                resources['ffmpeg_in_use'],
+                resources['ffmpeg_waiting'],
+                children_rss_bytes() or 0,
+            ))
+            stop.wait(self.config.sample_interval)
+
+    def _delivery_delays(self):
+        delays = []
+        for request_id, events in self.received.items():
+            progress = [t for t, data in events if data.get("status") == "processing"]
+            emitted = self.emitted.get(request_id, [])
+            # Progress events go through a FIFO queue, so the i-th received matches the i-th emitted
+            delays.extend(recv - sent for recv, sent in zip(progress, emitted))
+        return delays
+
+    def run(self):
+        """Starts the app, drives the configured load and returns a report dict."""
+        from app.main import app
+
+        with ExitStack() as stack:
+            if self.config.renderer == "real":
+                stack.enter_context(stub_upstreams(self.config.ayah_seconds, self.config.upstream_latency,
+                                                   max(7, self.config.ayahs_per_request)))
+            stack.enter_context(mock.patch("app.api.v1.endpoints.generate_video",
+                                           new=self._instrumented_renderer))
+
+            server = AppServer(app, self.config.lag_interval)
+            server.start()
+            stop_sampling = threading.Event()
+            sampler = threading.Thread(target=self._sample, args=(stop_sampling,), daemon=True)
+            sampler.start()
+
+            jobs = []
+            t0 = time.perf_counter()
+            try:
+                for index, offset in enumerate(arrival_offsets(self.config)):
+                    delay = t0 + offset - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    job = threading.Thread(target=self._run_job, args=(server.base_url, index), daemon=True)
+                    job.start()
+                    jobs.append(job)
+                for job in jobs:
+                    job.join()
+                duration = time.perf_counter() - t0
+            finally:
+                stop_sampling.set()
+                sampler.join()
+                server.stop()
+
+        return self._report(duration, server.lag_samples)
+
+    def _report(self, duration, lag_samples):
+        ok = [r for r in self.results if r['error'] is None]
+        errors = Counter(r['error'] for r in self.results if r['error'] is not None)
+        completed = sum(
+            1 for events in self.received.values()
+            if any(data.get("status") == "complete" for _, data in events)
+        )
+        config = asdict(self.config)
+        config['renderer'] = getattr(self.renderer, "name", self.config.renderer)
+        peak_rss = max(max((s[0] for s in self.samples), default=0), peak_rss_bytes())
+
+        return {
+            'config': config,
+            'requests': len(self.results),
+            'ok': len(ok),
+            'error_rate': (len(self.results) - len(ok)) / len(self.results) if self.results else 0.0,
+            'errors': dict(errors),
+            'duration_s': duration,
+            'throughput_rps': len(ok) / duration if duration else 0.0,
+            'latency': summarize([r['latency'] for r in ok]),
+            'event_loop_lag': summarize(lag_samples),
+            'sse': {
+                'subscribers': len(self.received),
+                'completed': completed,
+                'events': sum(len(events) for events in self.received.values()),
+                'delivery_delay': summarize(self._delivery_delays()),
+            },
+            'queues': {
+                'peak_open': max((s[1] for s in self.samples), default=0),
+                'peak_pending_events': max((s[2] for s in self.samples), default=0),
+            },
+            'peak_open_fds': max((s[3] for s in self.samples), default=0),
+            'ffmpeg': {
+                'limit': resource_counts()['ffmpeg_limit'],
+                'peak_in_use': max((s[4] for s in self.samples), default=0),
+                'peak_waiting': max((s[5] for s in self.samples), default=0),
+            },
+            'peak_rss_bytes': peak_rss,
+            # ffmpeg decoders/encoders run as child processes: most of a real render's memory
+            'peak_children_rss_bytes': max((s[6] for s in self.samples), default=0),
+            'peak_total_rss_bytes': max(max((s[0] + s[6] for s in self.samples), default=0), peak_rss),
+        }
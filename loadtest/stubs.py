@@ -0,0 +1,208 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from unittest import mock
+
+from app.core.config import settings
+
+FIXTURES_DIR = os.path.join(tempfile.gettempdir(), "quran_loadtest_fixtures")
+
+SAMPLE_ARABIC = "إِنَّا أَعْطَيْنَاكَ الْكَوْثَرَ"
+SAMPLE_ENGLISH = "Indeed, We have granted you, [O Muhammad], al-Kawthar."
+
+
+def _ffmpeg_binary():
+    from moviepy.config import FFMPEG_BINARY
+    return FFMPEG_BINARY
+
+
+def ensure_fixtures(ayah_seconds=2.0, directory=FIXTURES_DIR):
+    """
+    Synthesizes a recitation-like audio file and a background video once,
+    so the real pipeline can run without touching the network.
+    """
+    os.makedirs(directory, exist_ok=True)
+    audio_path = os.path.join(directory, f"ayah_{ayah_seconds:.2f}s.mp3")
+    background_path = os.path.join(directory, "background_640x360.mp4")
+
+    if not os.path.exists(audio_path):
+        subprocess.run([
+            _ffmpeg_binary(), "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"sine=frequency=220:duration={ayah_seconds}",
+            "-c:a", "libmp3lame", "-b:a", "64k", audio_path,
+        ], check=True)
+
+    if not os.path.exists(background_path):
+        subprocess.run([
+            _ffmpeg_binary(), "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", "testsrc=size=640x360:rate=24:duration=4",
+            "-c:v", "libx264", "-pix_fmt", "yuv420p", background_path,
+        ], check=True)
+
+    return audio_path, background_path
+
+
+class _StubResponse:
+    def __init__(self, payload):
+        self._payload = payload
+        self.status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._payload
+
+
+def quran_payload(reciter_id, translation_id, ayah_count=7):
+    """Builds an alquran.cloud-shaped response with `ayah_count` ayahs."""
+    arabic = {
+        'edition': {'identifier': reciter_id},
+        'ayahs': [
+            {'numberInSurah': n, 'text': SAMPLE_ARABIC, 'audio': f"stub://audio/{n}"}
+            for n in range(1, ayah_count + 1)
+        ],
+    }
+    english = {
+        'edition': {'identifier': translation_id},
+        'ayahs': [
+            {'numberInSurah': n, 'text': SAMPLE_ENGLISH}
+            for n in range(1, ayah_count + 1)
+        ],
+    }
+    return {'data': [arabic, english]}
+
+
+@contextmanager
+def stub_upstreams(ayah_seconds=2.0, latency=0.0, ayah_count=7):
+    """
+    Replaces the Quran API call and the audio/background downloads used by
+    `app.services.video_generator` with local fixtures. `latency` adds a fixed
+    delay (in seconds) to every stubbed upstream call.
+    """
+    audio_fixture, background_fixture = ensure_fixtures(ayah_seconds)
+
+    def fake_get(url, *args, **kwargs):
+        if latency:
+            time.sleep(latency)
+        editions = url.rstrip("/").split("/")[-1].split(",")
+        return _StubResponse(quran_payload(editions[0], editions[-1], ayah_count))
+
+    def fake_download(url, local_filename, *args, **kwargs):
+        if latency:
+            time.sleep(latency)
+        os.makedirs(os.path.dirname(local_filename), exist_ok=True)
+        source = audio_fixture if url.startswith("stub://audio/") else background_fixture
+        shutil.copyfile(source, local_filename)
+        return True
+
+    # Patch the module reference rather than `requests.get` itself, so the
+    # harness's own HTTP client keeps talking to the real network stack
+    with mock.patch("app.services.video_generator.requests", new=SimpleNamespace(get=fake_get)), \
+         mock.patch("app.services.video_generator.download_file", new=fake_download):
+        yield
+
+
+class FakeRenderer:
+    """
+    Stand-in for `generate_video` that reproduces its progress cadence (one
+    callback per rendered frame) and wall time without decoding or encoding.
+
+    `cpu_fraction` is the share of wall time spent holding the GIL in a busy
+    loop, which is what the real render's compositing does to the event loop.
+    """
+    name = "fake"
+
+    def __init__(self, seconds_per_ayah=2.0, cpu_fraction=0.3, ayah_seconds=2.0, output_bytes=256 * 1024):
+        self.seconds_per_ayah = seconds_per_ayah
+        self.cpu_fraction = min(max(cpu_fraction, 0.0), 1.0)
+        self.ayah_seconds = ayah_seconds
+        self.output_bytes = output_bytes
+
+    def _work(self, seconds):
+        busy = seconds * self.cpu_fraction
+        deadline = time.perf_counter() + busy
+        while time.perf_counter() < deadline:
+            pass
+        if seconds - busy > 0:
+            time.sleep(seconds - busy)
+
+    def __call__(self, request, progress_callback=None, cancel_token=None, job_id=None):
+        def report_progress(p, msg):
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
+            if progress_callback:
+                progress_callback(p, msg)
+
+        ayah_count = request.ayah_end - request.ayah_start + 1
+        total_seconds = ayah_count * self.seconds_per_ayah
+
+        # Same phase split as the real pipeline: ~30% preparation, ~70% rendering
+        for percentage, message in [(5, "status_starting"), (10, "status_fetching"),
+                                    (20, "status_downloading"), (30, "status_processing_audio"),
+                                    (40, "status_processing_video"), (50, "status_subtitles"),
+                                    (70, "status_rendering")]:
+            report_progress(percentage, message)
+            self._work(total_seconds * 0.3 / 7)
+
+        frames = max(1, int(ayah_count * self.ayah_seconds * settings.FPS))
+        frame_seconds = total_seconds * 0.7 / frames
+        for frame in range(1, frames + 1):
+            self._work(frame_seconds)
+            report_progress(70 + int(frame * 100 / frames * 0.3), "status_rendering")
+
+        report_progress(100, "status_completed")
+
+        os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
+        output_filepath = os.path.join(
+            settings.OUTPUT_DIR,
+            f"loadtest_{request.request_id or threading.get_ident()}.mp4"
+        )
+        with open(output_filepath, "wb") as f:
+            f.write(os.urandom(self.output_bytes))
+        return output_filepath
+
+
+def real_renderer():
+    """Returns the real `generate_video` (to be used under `stub_upstreams`)."""
+    from app.services.video_generator import generate_video
+
+    def render(request, progress_callback=None, cancel_token=None, job_id=None):
+        return generate_video(request, progress_callback, cancel_token, job_id)
+
+    render.name = "real"
+    return render
+
+
+def calibrate_fake_renderer(ayahs=1, ayah_seconds=2.0, resolution=360):
+    """
+    Runs the real pipeline once against the stubbed upstreams and returns a
+    FakeRenderer with matching wall time per ayah and CPU share.
+    """
+    from app.models import VideoRequest
+    from app.services.video_generator import generate_video
+
+    request = VideoRequest(surah=108, ayah_start=1, ayah_end=ayahs, resolution=resolution,
+                           request_id="calibration")
+    with stub_upstreams(ayah_seconds=ayah_seconds, ayah_count=ayahs):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        output_filepath = generate_video(request)
+        cpu_seconds = time.process_time() - cpu_start
+        wall_seconds = time.perf_counter() - wall_start
+
+    output_bytes = os.path.getsize(output_filepath)
+    os.remove(output_filepath)
+
+    return FakeRenderer(
+        seconds_per_ayah=wall_seconds / ayahs,
+        # process_time excludes the ffmpeg subprocesses; cap at one core
+        cpu_fraction=min(cpu_seconds / wall_seconds, 1.0),
+        ayah_seconds=ayah_seconds,
+        output_bytes=output_bytes,
+    )
@@ -0,0 +1,172 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+from fastapi import BackgroundTasks
+from fastapi.testclient import TestClient
+
+from app.api.v1 import endpoints
+from app.core.config import settings
+from app.main import app
+from app.models import VideoRequest
+from app.services.video_generator import generate_video, generate_videos
+from app.utils.cancellation import CancellationToken, JobCancelled, ABANDONED, DEADLINE, DELETED
+from loadtest.stubs import stub_upstreams
+
+
+def test_token_deadline_and_first_reason_wins():
+    token = CancellationToken(timeout=0.05)
+    token.raise_if_cancelled()
+    time.sleep(0.06)
+    with pytest.raises(JobCancelled) as exc:
+        token.raise_if_cancelled()
+    assert exc.value.reason == DEADLINE
+
+    token.cancel(DELETED)
+    assert token.reason == DEADLINE
+    assert not CancellationToken().cancelled
+
+
+def _job_dirs():
+    if not os.path.isdir(settings.TEMP_DIR):
+        return set()
+    return {name for name in os.listdir(settings.TEMP_DIR) if name.startswith("job_")}
+
+
+@pytest.mark.parametrize("render, outputs", [
+    (generate_video, None),
+    (generate_videos, [{"platform": "reel", "resolution": 360}, {"platform": "youtube", "resolution": 360}]),
+])
+def test_cancel_mid_render_releases_scratch_and_partial_output(render, outputs):
+    request = VideoRequest(surah=108, ayah_start=1, ayah_end=1, resolution=360,
+                           request_id="cancel-test", outputs=outputs)
+    token = CancellationToken()
+    seen = []
+
+    def progress(percentage, message):
+        seen.append(message)
+        if percentage > 70:
+            token.cancel(DELETED)
+
+    before = _job_dirs()
+    with stub_upstreams(ayah_seconds=2.0):
+        with pytest.raises(JobCancelled):
+            render(request, progress, token)
+
+    assert "status_rendering" in seen and "status_completed" not in seen
+    assert _job_dirs() == before
+    leftovers = [name for name in os.listdir(settings.OUTPUT_DIR) if "cancel-test" in name]
+    assert leftovers == []
+
+
+def test_cancel_while_finalizing_removes_finished_outputs():
+    request = VideoRequest(surah=108, ayah_start=1, ayah_end=1, resolution=360, request_id="late-cancel")
+    token = CancellationToken()
+
+    def progress(percentage, message):
+        # Last rendering callback: every frame is written, the encoders are about to finalize
+        if message == "status_rendering" and percentage == 100:
+            token.cancel(DELETED)
+
+    with stub_upstreams(ayah_seconds=0.5):
+        with pytest.raises(JobCancelled):
+            generate_video(request, progress, token)
+
+    assert [name for name in os.listdir(settings.OUTPUT_DIR) if "late-cancel" in name] == []
+
+
+def test_delete_unknown_job_is_404():
+    with TestClient(app) as client:
+        resp = client.delete(f"{settings.API_V1_STR}/jobs/does-not-exist")
+    assert resp.status_code == 404
+
+
+def test_abandoned_request_stops_its_render(monkeypatch):
+    started = threading.Event()
+    tokens = []
+
+    def blocking_render(request, progress_callback, cancel_token, job_id):
+        tokens.append(cancel_token)
+        started.set()
+        while not cancel_token.cancelled:
+            time.sleep(0.01)
+        cancel_token.raise_if_cancelled()
+
+    class ConnectedRequest:
+        async def is_disconnected(self):
+            return False
+
+    async def abandon():
+        request = VideoRequest(surah=108, ayah_start=1, ayah_end=1, request_id="abandoned")
+        task = asyncio.create_task(endpoints.generate_video_endpoint(request, ConnectedRequest(), BackgroundTasks()))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    monkeypatch.setattr(endpoints, "generate_video", blocking_render)
+    asyncio.run(abandon())
+    assert tokens[0].reason == ABANDONED
+    assert "abandoned" not in endpoints.jobs
+
+
+def test_responses_carry_the_job_id(monkeypatch):
+    render_job_ids = []
+
+    def failing_render(request, progress_callback, cancel_token, job_id):
+        render_job_ids.append(job_id)
+        raise ValueError("no such ayah")
+
+    monkeypatch.setattr(endpoints, "generate_video", failing_render)
+    with TestClient(app) as client:
+        resp = client.post(f"{settings.API_V1_STR}/generate-video",
+                           json={"surah": 108, "ayah_start": 1, "ayah_end": 1, "request_id": "job-42"})
+        anonymous = client.post(f"{settings.API_V1_STR}/generate-video",
+                                json={"surah": 108, "ayah_start": 1, "ayah_end": 1})
+    assert resp.status_code == 400
+    assert resp.headers["X-Job-Id"] == "job-42"
+    # Without a request_id the generated id is the one the render logs under
+    assert render_job_ids == ["job-42", anonymous.headers["X-Job-Id"]]
+
+
+def test_cancelling_one_anonymous_job_leaves_a_concurrent_one_alone():
+    # Same ayahs and platform, no request_id: the jobs must not share an output path
+    request = VideoRequest(surah=108, ayah_start=1, ayah_end=1, resolution=360)
+    token = CancellationToken()
+    results = {}
+
+    def cancelled_render():
+        def progress(percentage, message):
+            if percentage > 75:
+                token.cancel(DELETED)
+        try:
+            generate_video(request, progress, token)
+        except JobCancelled:
+            results["cancelled"] = True
+
+    def finished_render():
+        results["path"] = generate_video(request)
+
+    with stub_upstreams(ayah_seconds=1.0):
+        threads = [threading.Thread(target=cancelled_render), threading.Thread(target=finished_render)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=60)
+
+    assert results.get("cancelled")
+    assert os.path.exists(results["path"])
+    os.remove(results["path"])
+
+
+def test_job_id_header_is_readable_cross_origin(monkeypatch):
+    def failing_render(request, progress_callback, cancel_token, job_id):
+        raise ValueError("no such ayah")
+
+    monkeypatch.setattr(endpoints, "generate_video", failing_render)
+    with TestClient(app) as client:
+        resp = client.post(f"{settings.API_V1_STR}/generate-video", headers={"Origin": "https://example.com"},
+                           json={"surah": 108, "ayah_start": 1, "ayah_end": 1})
+    assert "x-job-id" in resp.headers["access-control-expose-headers"].lower()
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from moviepy import VideoFileClip
+
+from app.services.frame_pipe import PipeFrameWriter, ScaledVideoReader, background_filter, probe_video_size
+from loadtest.framebench import ensure_background
+
+
+def test_background_filter_only_scales_the_visible_region():
+    # Portrait from landscape: central region, turned clockwise like rotated(angle=-90), then upscaled
+    assert background_filter((1280, 720), (720, 1280)) == "crop=720:405,transpose=clock,scale=720:1280:flags=lanczos"
+    # Large enough source: plain center crop, no resampling
+    assert background_filter((1920, 1080), (360, 640)) == "crop=640:360,transpose=clock"
+    assert background_filter((1920, 1080), (1280, 720)) == "crop=1280:720"
+
+
+def test_reader_matches_moviepy_and_reuses_its_ring():
+    background = ensure_background("1280x720")
+    source_size = probe_video_size(background)
+    reader = ScaledVideoReader(background, source_size, [(360, 640)], fps=24, n_frames=5, ring_size=2)
+    try:
+        frames = [reader.read() for _ in range(5)]
+        with pytest.raises(IOError):
+            reader.read()
+    finally:
+        reader.close()
+    assert all(frame.shape == (640, 360, 3) for frame in frames)
+    assert len({id(frame) for frame in frames}) == 2
+
+    reader = ScaledVideoReader(background, source_size, [(360, 640)], fps=24, n_frames=1)
+    first = reader.read().copy()
+    reader.close()
+    clip = VideoFileClip(background, audio=False).rotated(angle=-90)
+    expected = clip.cropped(x_center=clip.w / 2, y_center=clip.h / 2, width=360, height=640).get_frame(0)
+    clip.close()
+    assert np.array_equal(first, expected)
+
+    # Closing mid-stream stops ffmpeg and the read-ahead thread
+    reader = ScaledVideoReader(background, source_size, [(360, 640)], fps=24, n_frames=500)
+    reader.read()
+    proc = reader.proc
+    reader.close()
+    assert proc.returncode is not None
+
+
+def test_reader_splits_one_decode_into_every_target():
+    background = ensure_background("1280x720")
+    source_size = probe_video_size(background)
+    sizes = [(360, 640), (640, 360), (1280, 720)]
+    reader = ScaledVideoReader(background, source_size, sizes, fps=24, n_frames=3)
+    try:
+        frames = [[reader.read(index).copy() for index in range(len(sizes))] for _ in range(3)]
+    finally:
+        reader.close()
+    for per_target in frames:
+        assert [frame.shape[1::-1] for frame in per_target] == sizes
+
+    # Each stream is the same picture as a reader dedicated to that target
+    for index, size in enumerate(sizes):
+        single = ScaledVideoReader(background, source_size, [size], fps=24, n_frames=3)
+        try:
+            expected = [single.read().copy() for _ in range(3)]
+        finally:
+            single.close()
+        assert all(np.array_equal(frames[n][index], expected[n]) for n in range(3))
+
+
+def test_pipe_writer_accepts_views_and_copies(tmp_path):
+    path = str(tmp_path / "out.mp4")
+    writer = PipeFrameWriter(path, (64, 32), 24, codec="libx264")
+    canvas = np.zeros((32, 128, 3), dtype=np.uint8)
+    for value in range(0, 240, 10):
+        canvas[:] = value
+        writer.write_frame(canvas[:, ::2])       # strided view: copied once
+        writer.write_frame(canvas[:, :64].copy())  # contiguous: written as is
+    writer.close()
+
+    clip = VideoFileClip(path)
+    assert tuple(clip.size) == (64, 32)
+    assert clip.n_frames == 48
+    clip.close()
+
+
+def test_pipe_writer_abort_kills_the_encoder_without_finalizing(tmp_path):
+    path = str(tmp_path / "aborted.mp4")
+    writer = PipeFrameWriter(path, (640, 360), 24, codec="libx264")
+    proc = writer.proc
+    frame = np.zeros((360, 640, 3), dtype=np.uint8)
+    for _ in range(48):
+        writer.write_frame(frame)
+    writer.abort()
+    writer.abort()  # idempotent, like close()
+
+    assert writer.proc is None and proc.returncode != 0
+    # x264 never flushed and the muxer never wrote its index: not a playable file
+    with pytest.raises(Exception):
+        VideoFileClip(path).close()
@@ -0,0 +1,44 @@
+import subprocess
+import sys
+import time
+
+from loadtest.metrics import children_rss_bytes
+from loadtest.runner import LoadTest, LoadTestConfig, arrival_offsets
+from loadtest.stubs import FakeRenderer
+
+
+def test_arrival_patterns():
+    assert arrival_offsets(LoadTestConfig(requests=3, pattern="burst")) == [0.0, 0.0, 0.0]
+    assert arrival_offsets(LoadTestConfig(requests=3, pattern="constant", rate=2)) == [0.0, 0.5, 1.0]
+
+    poisson = arrival_offsets(LoadTestConfig(requests=5, pattern="poisson", rate=10, seed=1))
+    assert poisson == sorted(poisson) and poisson[0] == 0.0
+
+
+def test_fake_load_run_reports_metrics():
+    """Small burst against the in-process app with the fake renderer (no network, no ffmpeg)."""
+    config = LoadTestConfig(requests=3, pattern="burst", ayah_seconds=0.25, request_timeout=60)
+    renderer = FakeRenderer(seconds_per_ayah=0.3, cpu_fraction=0.2, ayah_seconds=0.25, output_bytes=1024)
+
+    report = LoadTest(config, renderer).run()
+
+    assert report['ok'] == 3, report['errors']
+    assert report['error_rate'] == 0.0
+    assert report['latency']['count'] == 3
+    assert report['sse']['completed'] == 3
+    assert report['sse']['delivery_delay']['count'] > 0
+    assert report['event_loop_lag']['count'] > 0
+    assert report['peak_rss_bytes'] > 0
+    assert report['peak_total_rss_bytes'] >= report['peak_rss_bytes']
+
+
+def test_children_rss_counts_live_child_processes():
+    before = children_rss_bytes()
+    child = subprocess.Popen([sys.executable, "-c", "import sys; sys.stdin.read()"], stdin=subprocess.PIPE)
+    try:
+        deadline = time.monotonic() + 5
+        while children_rss_bytes() <= before and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert children_rss_bytes() > before
+    finally:
+        child.communicate(b"")
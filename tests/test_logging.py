@@ -0,0 +1,94 @@
+import json
+import logging
+import queue
+
+from app.core.logging import (
+    JobContextFilter, JobQueueHandler, JsonFormatter, RateLimitFilter,
+    SizeAndTimeRotatingFileHandler, log_context, set_log_phase,
+)
+
+
+def _record(msg="hello %s", args=("world",), level=logging.INFO):
+    return logging.LogRecord("quran_reels", level, __file__, 10, msg, args, None)
+
+
+def test_json_output_carries_job_context():
+    record = _record()
+    with log_context(job_id="job-1", phase="fetching"):
+        set_log_phase("rendering")
+        JobContextFilter().filter(record)
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "hello world"
+    assert entry["job_id"] == "job-1"
+    assert entry["phase"] == "rendering"
+
+    # Context does not leak outside the block
+    outside = _record()
+    JobContextFilter().filter(outside)
+    assert outside.job_id is None and outside.phase is None
+
+
+def test_rate_limit_suppresses_repeats_and_reports_count():
+    now = [0.0]
+    limiter = RateLimitFilter(burst=3, interval=10.0, clock=lambda: now[0])
+
+    passed = [limiter.filter(_record()) for _ in range(10)]
+    assert passed == [True] * 3 + [False] * 7
+    assert limiter.filter(_record(msg="other")) is True
+
+    now[0] = 11.0
+    record = _record()
+    assert limiter.filter(record) is True
+    assert record.suppressed == 7
+
+
+def test_rate_limit_reports_a_window_that_expires_without_repeats():
+    now = [0.0]
+    reports = []
+    limiter = RateLimitFilter(burst=1, interval=10.0, clock=lambda: now[0],
+                              report=lambda key, count: reports.append((key[2], count)))
+
+    for _ in range(4):
+        limiter.filter(_record())
+    limiter.filter(_record(msg="other"))
+    assert reports == []
+
+    # The repeated message never comes back: the next record of any kind reports its window, once
+    now[0] = 11.0
+    assert limiter.filter(_record(msg="other")) is True
+    limiter.filter(_record(msg="other"))
+    assert reports == [("hello %s", 3)]
+    record = _record()
+    limiter.filter(record)
+    assert not getattr(record, "suppressed", 0)
+
+
+def test_queue_handler_never_blocks_when_full():
+    handler = JobQueueHandler(queue.Queue(maxsize=1))
+    handler.addFilter(JobContextFilter())
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        import sys
+        exc_record = logging.LogRecord("quran_reels", logging.ERROR, __file__, 1, "boom", None, sys.exc_info())
+    handler.handle(exc_record)
+    handler.handle(_record())
+
+    assert handler.dropped == 1
+    queued = handler.queue.get_nowait()
+    assert queued.exc_info is None and "ZeroDivisionError" in queued.exc_text
+    assert "ZeroDivisionError" in json.loads(JsonFormatter().format(queued))["exc"]
+
+
+def test_file_handler_rotates_on_size(tmp_path):
+    path = tmp_path / "app.log"
+    handler = SizeAndTimeRotatingFileHandler(str(path), maxBytes=200, backupCount=2)
+    handler.setFormatter(JsonFormatter())
+    for _ in range(20):
+        handler.emit(_record())
+    handler.close()
+
+    assert path.exists()
+    assert (tmp_path / "app.log.1").exists()
+    assert not (tmp_path / "app.log.3").exists()
@@ -0,0 +1,112 @@
+import os
+import zipfile
+
+import pytest
+from moviepy import VideoFileClip
+from pydantic import ValidationError
+
+from app.api.v1.endpoints import zip_outputs
+from app.models import VideoRequest
+from app.services import video_generator
+from app.services.multi_output import render_outputs
+from app.services.video_generator import generate_videos
+from app.utils import resources
+from app.utils.cancellation import CancellationToken, JobCancelled, DELETED
+from loadtest.stubs import stub_upstreams
+
+
+def test_outputs_are_validated():
+    with pytest.raises(ValidationError):
+        VideoRequest(surah=108, ayah_start=1, ayah_end=1, outputs=[])
+    with pytest.raises(ValidationError):
+        VideoRequest(surah=108, ayah_start=1, ayah_end=1, outputs=[{"platform": "reel", "resolution": 999}])
+
+
+def test_generate_videos_renders_every_target_once():
+    """Stubbed upstreams (local fixtures), so this runs without network access."""
+    request = VideoRequest(
+        surah=108, ayah_start=1, ayah_end=1, request_id="multi-test",
+        outputs=[
+            {"platform": "reel", "resolution": 360},
+            {"platform": "youtube", "resolution": 360},
+            {"platform": "reel", "resolution": 360},  # duplicate, rendered once
+        ],
+    )
+    progress = []
+    with stub_upstreams(ayah_seconds=0.5):
+        paths = generate_videos(request, lambda p, msg: progress.append(p))
+
+    try:
+        assert len(paths) == 2
+        sizes = []
+        for path in paths:
+            clip = VideoFileClip(path)
+            sizes.append(tuple(clip.size))
+            assert clip.audio is not None
+            assert clip.duration == pytest.approx(0.5, abs=0.15)
+            clip.close()
+        assert sizes == [(360, 640), (640, 360)]
+        assert progress[-1] == 100 and progress == sorted(progress)
+    finally:
+        for path in paths:
+            os.remove(path)
+
+
+def test_outputs_beyond_the_process_budget_are_refused_up_front(monkeypatch):
+    def fetch(*args, **kwargs):
+        raise AssertionError("nothing should be fetched")
+
+    monkeypatch.setattr(resources, "ffmpeg_budget", resources.ProcessBudget(2))
+    monkeypatch.setattr(video_generator, "_fetch_ayahs", fetch)
+    request = VideoRequest(surah=108, ayah_start=1, ayah_end=1, outputs=[
+        {"platform": "reel", "resolution": 360},
+        {"platform": "youtube", "resolution": 360},
+    ])
+    with pytest.raises(ValueError, match="MAX_FFMPEG_PROCESSES=2"):
+        generate_videos(request)
+
+
+class _RecordingBranch:
+    def __init__(self, log):
+        self.log = log
+
+    def write(self, t):
+        return 0
+
+    def close(self):
+        self.log.append("close")
+
+    def abort(self):
+        self.log.append("abort")
+
+
+def test_render_outputs_finalizes_only_a_completed_loop():
+    log = []
+    render_outputs([_RecordingBranch(log), _RecordingBranch(log)], 3, 24)
+    assert log == ["close", "close"]
+
+    log.clear()
+    token = CancellationToken()
+
+    def progress(percentage):
+        token.cancel(DELETED)
+
+    with pytest.raises(JobCancelled):
+        render_outputs([_RecordingBranch(log), _RecordingBranch(log)], 3, 24, progress, token)
+    assert log == ["abort", "abort"]
+
+
+def test_zip_outputs_removes_every_file_when_archiving_fails(tmp_path, monkeypatch):
+    paths = []
+    for name in ("a.mp4", "b.mp4"):
+        path = tmp_path / name
+        path.write_bytes(b"\0" * 64)
+        paths.append(str(path))
+
+    def disk_full(self, filename, arcname=None, *args, **kwargs):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(zipfile.ZipFile, "write", disk_full)
+    with pytest.raises(OSError):
+        zip_outputs(paths)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,64 @@
+import numpy as np
+
+from app.services.overlay import OverlayTile, OverlayCompositor
+
+
+def _reference(background, layers):
+    """Straight-alpha float compositing of the layers over the background."""
+    out = background.astype(np.float64)
+    for rgb, alpha, (x, y) in layers:
+        h, w = rgb.shape[:2]
+        y0, x0 = max(y, 0), max(x, 0)
+        y1, x1 = min(y + h, out.shape[0]), min(x + w, out.shape[1])
+        a = alpha[y0 - y:y1 - y, x0 - x:x1 - x, None]
+        region = out[y0:y1, x0:x1]
+        out[y0:y1, x0:x1] = rgb[y0 - y:y1 - y, x0 - x:x1 - x] * a + region * (1 - a)
+    return out
+
+
+def test_blend_matches_float_reference():
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 256, (90, 160, 3), dtype=np.uint8)
+    layers = []
+    for position, size in [((20, 10), (30, 100)), ((-5, 50), (40, 60)), ((140, 70), (30, 40))]:
+        rgb = rng.integers(0, 256, size + (3,), dtype=np.uint8)
+        alpha = rng.random(size)
+        alpha[:3] = 0  # transparent padding rows, as in TextClips
+        layers.append((rgb, alpha, position))
+
+    tile = OverlayTile.from_layers(layers, (160, 90), start=0.0, end=1.0)
+    compositor = OverlayCompositor((160, 90), [tile])
+    frame = compositor.composite(background, 0.5)
+
+    expected = _reference(background, layers)
+    assert frame.shape == background.shape
+    # 8-bit alpha and two roundings: at most 1.5 levels off the exact result
+    assert np.abs(frame.astype(np.int16) - expected).max() <= 1.5
+    # Tile box is clipped to the canvas and tightened past the transparent rows
+    assert tile.x == 0 and tile.y == 13
+    assert tile.x + tile.size[0] <= 160 and tile.y + tile.size[1] <= 90
+
+
+def test_segments_select_tile_by_time_and_leave_background_untouched():
+    opaque = np.full((4, 4, 3), 200, dtype=np.uint8)
+    tiles = [
+        OverlayTile.from_layers([(opaque, None, (0, 0))], (8, 8), start=0.0, end=1.0),
+        OverlayTile.from_layers([(opaque, None, (4, 4))], (8, 8), start=1.0, end=2.5),
+    ]
+    compositor = OverlayCompositor((8, 8), tiles)
+    background = np.zeros((8, 8, 3), dtype=np.uint8)
+
+    first = compositor.composite(background, 0.99).copy()
+    assert first[0, 0, 0] == 200 and first[7, 7, 0] == 0
+
+    second = compositor.composite(background, 1.0).copy()
+    assert second[0, 0, 0] == 0 and second[7, 7, 0] == 200
+
+    assert compositor.composite(background, 2.5).max() == 0
+    assert background.max() == 0
+
+
+def test_fully_transparent_layers_produce_no_tile():
+    rgb = np.full((5, 5, 3), 255, dtype=np.uint8)
+    assert OverlayTile.from_layers([(rgb, np.zeros((5, 5)), (0, 0))], (10, 10), 0, 1) is None
+    assert OverlayTile.from_layers([(rgb, None, (20, 20))], (10, 10), 0, 1) is None
@@ -0,0 +1,89 @@
+import sys
+import threading
+import time
+
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import Settings
+from app.utils.cancellation import CancellationToken, JobCancelled, DELETED
+from app.utils.resources import JobResources, ProcessBudget, resource_counts
+
+
+class _Closable:
+    def __init__(self, log, name):
+        self.log, self.name = log, name
+
+    def close(self):
+        self.log.append(self.name)
+
+
+def test_budget_reserves_a_phase_atomically():
+    budget = ProcessBudget(4)
+    assert budget.acquire(3) == 3
+
+    acquired = threading.Event()
+    waiter = threading.Thread(target=lambda: (budget.acquire(2), acquired.set()))
+    waiter.start()
+    time.sleep(0.1)
+    # Only one slot is free: the two-slot phase waits instead of taking it
+    assert not acquired.is_set() and budget.in_use == 3 and budget.waiting == 1
+
+    budget.release(3)
+    waiter.join(timeout=2)
+    assert acquired.is_set() and budget.in_use == 2
+    # More than the whole budget could never be granted: refused rather than clamped
+    budget.release(2)
+    with pytest.raises(ValueError):
+        budget.acquire(5)
+    assert budget.in_use == 0 and budget.waiting == 0
+
+
+def test_budget_wait_is_cancellable():
+    budget = ProcessBudget(1)
+    budget.acquire(1)
+    token = CancellationToken()
+    threading.Timer(0.1, token.cancel, args=(DELETED,)).start()
+    with pytest.raises(JobCancelled):
+        budget.acquire(1, token)
+    assert budget.waiting == 0 and budget.in_use == 1
+
+
+def test_job_resources_close_everything_on_error():
+    log = []
+    budget = ProcessBudget(2)
+    with pytest.raises(RuntimeError):
+        with JobResources("res-test", budget=budget) as resources:
+            with resources.processes(2):
+                resources.track(_Closable(log, "reader"))
+                resources.track(_Closable(log, "writer"))
+                assert resource_counts()["by_job"] == [{"job_id": "res-test", "open": 2, "processes": 2}]
+                raise RuntimeError("render failed")
+    assert log == ["writer", "reader"]
+    assert budget.in_use == 0
+    assert resource_counts()["jobs"] == 0
+
+
+def test_run_kills_the_process_when_cancelled():
+    token = CancellationToken()
+    budget = ProcessBudget(1)
+    threading.Timer(0.2, token.cancel, args=(DELETED,)).start()
+    started = time.monotonic()
+    with JobResources(cancel_token=token, budget=budget) as resources:
+        with pytest.raises(JobCancelled):
+            resources.run([sys.executable, "-c", "import time; time.sleep(30)"])
+        assert resources.counts() == {"open": 0, "processes": 0}
+    assert time.monotonic() - started < 5
+    assert budget.in_use == 0
+
+    with JobResources(budget=budget) as resources:
+        with pytest.raises(IOError, match="boom"):
+            resources.run([sys.executable, "-c", "import sys; sys.exit('boom')"])
+
+
+def test_process_budget_setting_must_allow_a_single_render(monkeypatch):
+    monkeypatch.setenv("MAX_FFMPEG_PROCESSES", "1")
+    with pytest.raises(ValidationError):
+        Settings()
+    monkeypatch.setenv("MAX_FFMPEG_PROCESSES", "2")
+    assert Settings().MAX_FFMPEG_PROCESSES == 2